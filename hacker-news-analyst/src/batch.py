@@ -0,0 +1,108 @@
+"""
+无交互的批量问答：从 JSONL 文件读取问题，以受限并发交给同一个智能体回答，
+答案、工具调用轨迹和耗时按完成顺序写入 JSONL，最后打印吞吐量汇总。
+
+输入文件每行一个问题，形如 ``{"id": "q1", "question": "..."}``，``id`` 可省略。
+"""
+
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def load_questions(path: str) -> list[dict]:
+    """Read questions from a JSONL file, numbering those without an ``id``."""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            q = json.loads(line)
+            q.setdefault("id", str(i))
+            questions.append(q)
+    return questions
+
+
+def trace_tools(messages: list) -> list[dict]:
+    """Summarize the tool calls of a finished run, in call order."""
+    results = {m.tool_call_id: m for m in messages if m.type == "tool"}
+
+    out = []
+    for m in messages:
+        for c in getattr(m, "tool_calls", None) or []:
+            r = results.get(c["id"])
+            out.append(
+                {
+                    "name": c["name"],
+                    "args": c["args"],
+                    "output_bytes": len(str(r.content).encode("utf-8")) if r else None,
+                }
+            )
+    return out
+
+
+async def answer(agent, question: dict) -> dict:
+    """Run one question through ``agent`` and record its answer and latency."""
+    query = {"messages": [{"role": "user", "content": question["question"]}]}
+
+    started = time.perf_counter()
+    try:
+        r = await agent.ainvoke(query)
+        out = {
+            "id": question["id"],
+            "question": question["question"],
+            "answer": r["messages"][-1].content,
+            "tools": trace_tools(r["messages"]),
+        }
+    except Exception as e:
+        logger.exception(e)
+        out = {"id": question["id"], "question": question["question"], "error": str(e)}
+    out["latency"] = round(time.perf_counter() - started, 3)
+    return out
+
+
+async def run(agent, input_path: str, output_path: str, concurrency: int = 4) -> dict:
+    """Answer every question of ``input_path`` with at most ``concurrency`` runs
+    in flight, appending results to ``output_path`` as they complete.
+
+    Returns:
+        dict: Throughput summary of the batch.
+    """
+    questions = load_questions(input_path)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(q: dict) -> dict:
+        async with semaphore:
+            return await answer(agent, q)
+
+    started = time.perf_counter()
+    latencies = []
+    failed = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        for done in asyncio.as_completed([bounded(q) for q in questions]):
+            r = await done
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            f.flush()
+
+            latencies.append(r["latency"])
+            if "error" in r:
+                failed += 1
+            logger.info(f"[{len(latencies)}/{len(questions)}] {r['id']} {r['latency']:.2f}s")
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "questions": len(questions),
+        "failed": failed,
+        "concurrency": concurrency,
+        "wall_time": round(elapsed, 2),
+        "questions_per_minute": round(len(questions) * 60 / elapsed, 2) if elapsed else None,
+        "latency_p50": statistics.median(latencies) if latencies else None,
+        "latency_p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+        "latency_sum": round(sum(latencies), 2),
+    }
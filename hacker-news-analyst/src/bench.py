@@ -0,0 +1,154 @@
+"""
+HackerNews 数据拉取的基准测试。
+
+针对替身服务器（默认在进程内启动，见 fakehn.py）测量故事、用户和评论拉取在不同
+规模和并发度下的吞吐量与请求延迟分位数。缓存全程关闭，测的是网络拉取路径本身。
+
+    uv run src/bench.py --latency 0.05 --counts 10 30 100 --concurrency 1 4 16 64
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+
+import cache
+import fakehn
+import hackernews
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+async def measure(scenario: str, n: int, concurrency: int, fixtures: dict) -> dict:
+    """Run one scenario on a fresh client sized for ``concurrency``."""
+    # 连接池大小跟随并发度，避免被默认的池大小卡住
+    hackernews.MAX_CONCURRENCY = concurrency
+    await hackernews.aclose()
+
+    latencies = []
+
+    async def on_request(request):
+        request.extensions["bench_started"] = time.perf_counter()
+
+    async def on_response(response):
+        latencies.append(time.perf_counter() - response.request.extensions["bench_started"])
+
+    client = hackernews.get_client()
+    client.event_hooks = {"request": [on_request], "response": [on_response]}
+
+    errors = 0
+    started = time.perf_counter()
+    if scenario == "stories":
+        story_ids = await hackernews.fetch_top_story_ids()
+        items = await hackernews.fetch_items(story_ids[:n], concurrency)
+        errors = sum(1 for v in items if "error" in v)
+    elif scenario == "users":
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(name: str):
+            async with semaphore:
+                return await hackernews.fetch_user(name)
+
+        # 录制的数据里用户可能不足 n 个，循环使用，保证发出 n 个请求
+        pool = list(fixtures["users"])
+        names = [pool[i % len(pool)] for i in range(n)]
+        users = await asyncio.gather(*(fetch(v) for v in names), return_exceptions=True)
+        errors = sum(1 for v in users if not isinstance(v, dict))
+    elif scenario == "comments":
+        story = fixtures["items"][fixtures["topstories"][0]]
+        got = 0
+        async for level in hackernews.crawl_comments(
+            story, max_depth=100, max_comments=n, time_budget=600, concurrency=concurrency
+        ):
+            got += len(level)
+        errors = min(n, story.get("descendants") or 0) - got
+    else:
+        raise ValueError(f"unknown scenario: {scenario}")
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "n": n,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_s": round(elapsed, 3),
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+    }
+
+
+async def run(args, fixtures: dict) -> list[dict]:
+    results = []
+    try:
+        for scenario in args.scenarios:
+            for n in args.counts:
+                for c in args.concurrency:
+                    r = await measure(scenario, n, c, fixtures)
+                    logger.info(json.dumps(r))
+                    results.append(r)
+    finally:
+        await hackernews.aclose()
+    return results
+
+
+def print_table(results: list[dict]):
+    columns = list(results[0].keys())
+    widths = [max(len(c), *(len(str(r[c])) for r in results)) for c in columns]
+    print("  ".join(c.rjust(w) for c, w in zip(columns, widths)))
+    for r in results:
+        print("  ".join(str(r[c]).rjust(w) for c, w in zip(columns, widths)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HackerNews 拉取路径的基准测试")
+    parser.add_argument(
+        "--scenarios", nargs="+", default=["stories", "users", "comments"],
+        choices=["stories", "users", "comments"],
+    )
+    parser.add_argument("--counts", nargs="+", type=int, default=[10, 30, 100])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16, 64])
+    parser.add_argument("--fixtures", help="录制的数据文件，缺省时使用合成数据")
+    parser.add_argument("--latency", type=float, default=0.02, help="替身服务器的基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.01, help="替身服务器的随机附加延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身服务器返回 500 的概率")
+    parser.add_argument("--out", help="把结果以 JSONL 写入该文件")
+    args = parser.parse_args()
+
+    FORMAT = "%(asctime)s - %(filename)s(%(lineno)d) - %(levelname)s: %(message)s"
+    logging.basicConfig(format=FORMAT, datefmt="%Y-%m-%d %H:%M:%S", level=logging.INFO)
+
+    fixtures = (
+        fakehn.load_fixtures(args.fixtures)
+        if args.fixtures
+        else fakehn.synthesize(
+            max(args.counts),
+            comments_per_story=max(args.counts),
+            num_users=max(args.counts),
+        )
+    )
+    server = fakehn.Server(
+        ("127.0.0.1", 0), fixtures, args.latency, args.jitter, args.error_rate
+    )
+    server.start()
+    os.environ["HACKERNEWS_API_BASE_URL"] = server.base_url
+    cache.set_default(cache.Cache(None, capacity=0))
+
+    results = asyncio.run(run(args, fixtures))
+    server.shutdown()
+
+    print_table(results)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
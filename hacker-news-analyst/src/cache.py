@@ -0,0 +1,158 @@
+"""
+Hacker News 数据的本地 TTL 缓存：内存 LRU 在前，SQLite 文件在后。
+
+键的约定：
+- ``topstories``：热门故事 id 列表
+- ``item:<id>``：条目（故事、评论等）
+- ``user:<username>``：用户
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(".cache", "hackernews.db")
+
+# 热门列表变化很快
+TOPSTORIES_TTL = 60
+# 仍在变化中的条目（分数、评论数会涨）
+LIVE_ITEM_TTL = 5 * 60
+# HN 条目发布约两周后即不再接受投票和评论，此后视为不变
+STABLE_ITEM_AGE = 14 * 24 * 3600
+STABLE_ITEM_TTL = 30 * 24 * 3600
+USER_TTL = 30 * 60
+
+
+def item_ttl(item: dict) -> int:
+    """Pick the TTL of an item according to its age."""
+    age = time.time() - item.get("time", time.time())
+    return STABLE_ITEM_TTL if age > STABLE_ITEM_AGE else LIVE_ITEM_TTL
+
+
+class Cache:
+    """LRU in memory backed by an on-disk SQLite store, both honoring TTLs.
+
+    Args:
+        path: SQLite file path. ``None`` keeps the cache in memory only.
+        capacity: Max number of entries kept in the in-memory LRU.
+    """
+
+    def __init__(self, path: str | None = DEFAULT_PATH, capacity: int = 4096):
+        self.capacity = capacity
+        self.memory: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        # 工具可能在线程池里被调用，SQLite 连接需要加锁共享
+        self.lock = threading.Lock()
+        self.db = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self.db.commit()
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value, or ``None`` on a miss or an expired entry."""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self.memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[0]
+                del self.memory[key]
+
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.stats["disk_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+        expires_at = time.time() + ttl
+        with self.lock:
+            self._remember(key, value, expires_at)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at),
+                )
+                self.db.commit()
+
+    def set_many(self, entries: list[tuple[str, Any, float]]):
+        """Store ``(key, value, ttl)`` entries, committing them to disk at once."""
+        now = time.time()
+        rows = [(key, value, now + ttl) for key, value, ttl in entries]
+        with self.lock:
+            for key, value, expires_at in rows:
+                self._remember(key, value, expires_at)
+            if self.db is not None:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                    [(key, json.dumps(value), expires_at) for key, value, expires_at in rows],
+                )
+                self.db.commit()
+
+    def purge(self):
+        """Drop expired entries from the disk store."""
+        if self.db is None:
+            return
+        with self.lock:
+            self.db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            self.db.commit()
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        self.memory[key] = (value, expires_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+
+_default: Cache | None = None
+
+
+def get_default() -> Cache:
+    """Return the process-wide cache, opened lazily at ``HACKERNEWS_CACHE_PATH``."""
+    global _default
+
+    if _default is None:
+        _default = Cache(os.environ.get("HACKERNEWS_CACHE_PATH", DEFAULT_PATH))
+    return _default
+
+
+def set_default(c: Cache):
+    """Replace the process-wide cache, e.g. with ``Cache(None, capacity=0)`` to
+    disable caching in benchmarks."""
+    global _default
+
+    _default = c
@@ -0,0 +1,274 @@
+"""
+离线的 HackerNews Firebase API 替身服务器。
+
+回放录制好的数据（或按规模生成的合成数据），支持注入延迟和错误，用于离线测试
+和基准测试。
+
+录制线上数据：
+
+    uv run src/fakehn.py record --out fixtures/hn.json --num-stories 30
+
+启动替身服务器，并让智能体指向它：
+
+    uv run src/fakehn.py serve --fixtures fixtures/hn.json --latency 0.05 --error-rate 0.01
+    HACKERNEWS_API_BASE_URL=http://127.0.0.1:8765/v0 uv run src/main.py
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+PATH = re.compile(r"^/v0/(?:(topstories)|item/(\d+)|user/([^/]+))\.json$")
+
+
+def synthesize(
+    num_stories: int = 500,
+    comments_per_story: int = 40,
+    seed: int = 0,
+    num_users: int | None = None,
+) -> dict:
+    """Generate a deterministic fixture shaped like the real API.
+
+    Every story gets a comment tree of ``comments_per_story`` comments with a
+    branching factor of about 3, and every item links to one of a pool of
+    ``num_users`` users (``num_stories // 5`` by default).
+    """
+    rng = random.Random(seed)
+    now = int(time.time())
+
+    users = {}
+    for i in range(max(num_users or num_stories // 5, 1)):
+        name = f"user{i}"
+        users[name] = {
+            "id": name,
+            "created": now - rng.randint(30, 3000) * 86400,
+            "karma": rng.randint(1, 50000),
+            "about": f"About {name}",
+            "submitted": [],
+        }
+    names = list(users)
+
+    items = {}
+    topstories = []
+    next_id = 1
+    for _ in range(num_stories):
+        story_id = next_id
+        next_id += 1
+        by = rng.choice(names)
+        story = {
+            "id": story_id,
+            "type": "story",
+            "by": by,
+            "time": now - rng.randint(60, 3 * 86400),
+            "title": f"Story {story_id}",
+            "url": f"https://example{rng.randint(0, 20)}.com/{story_id}",
+            "score": rng.randint(1, 1500),
+            "descendants": comments_per_story,
+            "kids": [],
+        }
+        items[story_id] = story
+        users[by]["submitted"].append(story_id)
+        topstories.append(story_id)
+
+        parents = [story]
+        for _ in range(comments_per_story):
+            parent = parents[min(int(rng.expovariate(1 / 3)), len(parents) - 1)]
+            comment_id = next_id
+            next_id += 1
+            by = rng.choice(names)
+            comment = {
+                "id": comment_id,
+                "type": "comment",
+                "by": by,
+                "parent": parent["id"],
+                "time": story["time"] + rng.randint(60, 86400),
+                "text": f"<p>Comment {comment_id} on {parent['id']}",
+                "kids": [],
+            }
+            items[comment_id] = comment
+            parent["kids"].append(comment_id)
+            users[by]["submitted"].append(comment_id)
+            parents.append(comment)
+
+    for u in users.values():
+        u["submitted"].sort(reverse=True)
+    return {"topstories": topstories, "items": items, "users": users}
+
+
+def load_fixtures(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        fixtures = json.load(f)
+    # JSON 对象的键只能是字符串
+    fixtures["items"] = {int(k): v for k, v in fixtures["items"].items()}
+    return fixtures
+
+
+async def record(num_stories: int, max_comments: int) -> dict:
+    """Record top stories, up to ``max_comments`` comments of each and all their
+    authors from the live API."""
+    # 替身服务器本身只依赖标准库，录制时才需要 httpx 等依赖
+    import hackernews
+
+    try:
+        story_ids = await hackernews.fetch_json("/topstories.json")
+        stories = await hackernews.fetch_items(story_ids[:num_stories])
+        stories = [v for v in stories if "error" not in v]
+
+        items = {v["id"]: v for v in stories}
+        for story in stories:
+            # 按层广度优先拉取评论，直到达到上限
+            remaining = max_comments
+            frontier = story.get("kids", [])
+            while frontier and remaining > 0:
+                level = await hackernews.fetch_items(frontier[:remaining])
+                level = [v for v in level if "error" not in v]
+                items.update((v["id"], v) for v in level)
+                remaining -= len(level)
+                frontier = [k for v in level for k in v.get("kids", [])]
+
+        users = {}
+        for name in {v["by"] for v in items.values() if v.get("by")}:
+            user = await hackernews.fetch_user(name)
+            if user is not None:
+                users[name] = user
+    finally:
+        await hackernews.aclose()
+
+    return {"topstories": [v["id"] for v in stories], "items": items, "users": users}
+
+
+class Server(ThreadingHTTPServer):
+    """HTTP server answering ``/v0/...`` paths from ``fixtures``.
+
+    Args:
+        address: ``(host, port)`` to bind; port 0 picks a free port.
+        fixtures: Data as produced by :func:`synthesize` or :func:`record`.
+        latency: Base delay in seconds added to every response.
+        jitter: Max extra random delay in seconds.
+        error_rate: Probability of answering with HTTP 500.
+    """
+
+    daemon_threads = True
+    # 默认的监听队列只有 5，高并发压测时连接会因 SYN 重传多等约 1 秒
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        fixtures: dict,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+    ):
+        super().__init__(address, Handler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v0"
+
+    def start(self) -> threading.Thread:
+        """Serve from a background thread."""
+        t = threading.Thread(target=self.serve_forever, daemon=True)
+        t.start()
+        return t
+
+
+class Handler(BaseHTTPRequestHandler):
+    # 保持连接，和真实服务一样支持 keep-alive
+    protocol_version = "HTTP/1.1"
+
+    server: Server
+
+    def do_GET(self):
+        s = self.server
+        s.requests += 1
+
+        delay = s.latency + random.uniform(0, s.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if s.error_rate and random.random() < s.error_rate:
+            return self.reply(500, {"error": "injected failure"})
+
+        m = PATH.match(self.path)
+        if m is None:
+            return self.reply(404, {"error": "not found"})
+
+        topstories, item_id, username = m.groups()
+        if topstories:
+            body = s.fixtures["topstories"]
+        elif item_id:
+            body = s.fixtures["items"].get(int(item_id))
+        else:
+            body = s.fixtures["users"].get(username)
+        # Firebase 对不存在的资源返回 200 和 null
+        self.reply(200, body)
+
+    def reply(self, status: int, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HackerNews API 替身服务器")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("serve", help="启动替身服务器")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--fixtures", help="录制的数据文件，缺省时使用合成数据")
+    p.add_argument("--num-stories", type=int, default=500, help="合成数据的故事数")
+    p.add_argument("--latency", type=float, default=0.0, help="每个响应的基础延迟（秒）")
+    p.add_argument("--jitter", type=float, default=0.0, help="随机附加延迟的上限（秒）")
+    p.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率")
+
+    p = sub.add_parser("record", help="从线上 API 录制数据")
+    p.add_argument("--out", required=True, help="输出的数据文件")
+    p.add_argument("--num-stories", type=int, default=30)
+    p.add_argument("--max-comments", type=int, default=50, help="每个故事录制的评论数上限")
+
+    args = parser.parse_args()
+
+    FORMAT = "%(asctime)s - %(filename)s(%(lineno)d) - %(levelname)s: %(message)s"
+    logging.basicConfig(format=FORMAT, datefmt="%Y-%m-%d %H:%M:%S", level=logging.INFO)
+
+    if args.command == "record":
+        fixtures = asyncio.run(record(args.num_stories, args.max_comments))
+        if os.path.dirname(args.out):
+            os.makedirs(os.path.dirname(args.out), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(fixtures, f)
+        logger.info(
+            f"Recorded {len(fixtures['items'])} items and {len(fixtures['users'])} users"
+        )
+    else:
+        fixtures = (
+            load_fixtures(args.fixtures) if args.fixtures else synthesize(args.num_stories)
+        )
+        server = Server(
+            (args.host, args.port), fixtures, args.latency, args.jitter, args.error_rate
+        )
+        logger.info(f"Serving on {server.base_url}")
+        server.serve_forever()
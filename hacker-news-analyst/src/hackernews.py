@@ -1,43 +1,363 @@
+import asyncio
+import csv
+import html
+import io
 import json
 import logging
+import os
+import re
+import statistics
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from urllib.parse import urlparse
 
 import httpx
 from langchain.tools import tool
 
+import cache
+
 logger = logging.getLogger(__name__)
 
+# 可通过环境变量 HACKERNEWS_API_BASE_URL 指向本地的替身服务器，参见 fakehn.py
+BASE_URL = "https://hacker-news.firebaseio.com/v0"
+
+# 并发拉取条目详情的上限，同时也是连接池的大小
+MAX_CONCURRENCY = 16
+
+# 列表类结果默认保留的字段，`kids` 这类大数组只会浪费上下文
+STORY_FIELDS = ["id", "title", "by", "score", "descendants", "time", "url"]
+# 单个字段的最大长度，超出部分截断
+MAX_FIELD_LEN = 200
+# 用户活跃度分析最多拉取的提交条目数
+MAX_USER_ITEMS = 500
+# 超时未拉到的条目的错误信息
+TIMED_OUT = "timed out"
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive client, creating it on first use.
+
+    The client is bound to the running event loop, so a new one is created if
+    the previous loop has gone away (e.g. across separate ``asyncio.run`` calls).
+    """
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            base_url=os.environ.get("HACKERNEWS_API_BASE_URL", BASE_URL),
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENCY,
+                max_keepalive_connections=MAX_CONCURRENCY,
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def aclose():
+    """Close the shared client if it has been created."""
+    global _client, _client_loop
+
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+async def fetch_json(path: str):
+    """GET a Firebase API path (e.g. ``/item/1.json``) and decode the JSON body."""
+    response = await get_client().get(path)
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_items(
+    item_ids: list[int],
+    concurrency: int = MAX_CONCURRENCY,
+    use_cache: bool = True,
+    timeout: float | None = None,
+) -> list[dict]:
+    """Fetch items concurrently while keeping the order of ``item_ids``.
+
+    A failed item does not fail the whole batch: it is reported in place as
+    ``{"id": ..., "error": ...}``. Items still pending after ``timeout``
+    seconds are cancelled and reported with the error ``TIMED_OUT``. With
+    ``use_cache=False`` the cache is bypassed for reads but still refreshed
+    with what was fetched.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    store = cache.get_default()
+    # 拉到的条目攒起来一次性写入缓存，避免每个条目都在事件循环上提交一次 SQLite
+    fetched: list[tuple[str, dict, float]] = []
+
+    async def fetch(item_id: int) -> dict:
+        item = store.get(f"item:{item_id}") if use_cache else None
+        if item is not None:
+            return item
+
+        async with semaphore:
+            try:
+                item = await fetch_json(f"/item/{item_id}.json")
+            except Exception as e:
+                logger.warning(f"Failed to fetch item {item_id}: {e!r}")
+                return {"id": item_id, "error": str(e) or e.__class__.__name__}
+
+        if item is None:
+            return {"id": item_id, "error": "item not found"}
+        fetched.append((f"item:{item_id}", item, cache.item_ttl(item)))
+        return item
+
+    tasks = [asyncio.create_task(fetch(v)) for v in item_ids]
+    try:
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+    finally:
+        pending = [t for t in tasks if not t.done()]
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        # 超时或被取消时也保存已经拉到的条目
+        if fetched:
+            await asyncio.shield(asyncio.to_thread(store.set_many, fetched))
+
+    return [
+        {"id": v, "error": TIMED_OUT} if t.cancelled() else t.result()
+        for v, t in zip(item_ids, tasks)
+    ]
+
+
+async def fetch_top_story_ids() -> list[int]:
+    """Fetch the ranked ids of ``topstories.json``, served from cache when fresh."""
+    store = cache.get_default()
+
+    story_ids = store.get("topstories")
+    if story_ids is None:
+        story_ids = await fetch_json("/topstories.json")
+        store.set("topstories", story_ids, cache.TOPSTORIES_TTL)
+    return story_ids
+
+
+async def fetch_user(username: str) -> dict | None:
+    """Fetch a user, served from cache when fresh. ``None`` if no such user."""
+    store = cache.get_default()
+
+    key = f"user:{username}"
+    user = store.get(key)
+    if user is None:
+        user = await fetch_json(f"/user/{username}.json")
+        if user is not None:
+            store.set(key, user, cache.USER_TTL)
+    return user
+
+
+def format_time(ts: int) -> str:
+    """Render a Unix timestamp as a UTC date."""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def project(item: dict, fields: list[str], max_len: int = MAX_FIELD_LEN) -> dict:
+    """Keep only ``fields`` of ``item``, truncating long strings.
+
+    The Unix timestamp of ``time`` is rendered as a UTC date and the HTML of
+    ``text`` as plain text.
+    """
+    out = {}
+    for f in fields:
+        v = item.get(f)
+        if f == "time" and isinstance(v, int):
+            v = format_time(v)
+        elif f == "text" and v:
+            v = html_to_text(v)
+        if isinstance(v, str) and len(v) > max_len:
+            v = v[:max_len] + "…"
+        out[f] = v
+    return out
+
+
+def encode_rows(rows: list[dict], fields: list[str] | None = None) -> str:
+    """Encode a list of flat records as CSV with a header line.
+
+    Field names are written once instead of once per record, which makes list
+    results far smaller than JSON. ``fields`` defaults to the keys of the first
+    record.
+    """
+    if fields is None:
+        fields = list(rows[0].keys()) if rows else []
+
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(fields)
+    for v in rows:
+        writer.writerow(["" if v.get(f) is None else v.get(f) for f in fields])
+    return buf.getvalue()
+
+
+def encode_json(data) -> str:
+    """Encode ``data`` as JSON without insignificant whitespace."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def log_payload(tool_name: str, payload: str) -> str:
+    """Log the size of a tool's output and return it unchanged.
+
+    Tokens are estimated at 4 bytes per token, which is close enough for
+    tracking prompt growth.
+    """
+    size = len(payload.encode("utf-8"))
+    logger.info(f"{tool_name} returned {size} bytes (~{size // 4} tokens)")
+    return payload
+
+
+def domain_of(url: str | None) -> str | None:
+    """Host name of a story's URL, ``None`` for text posts such as Ask HN."""
+    return urlparse(url).hostname if url else None
+
+
+def summarize_activity(items: list[dict]) -> dict:
+    """Aggregate a user's submitted items into engagement statistics."""
+    items = [v for v in items if "error" not in v and not v.get("deleted")]
+
+    types = Counter(v.get("type") for v in items)
+    stories = [v for v in items if v.get("type") == "story"]
+    scores = sorted(v["score"] for v in stories if v.get("score") is not None)
+    hours = Counter(
+        datetime.fromtimestamp(v["time"], timezone.utc).hour
+        for v in items
+        if v.get("time")
+    )
+    domains = Counter(domain_of(v.get("url")) for v in stories if v.get("url"))
+    times = [v["time"] for v in items if v.get("time")]
+
+    return {
+        "items_analyzed": len(items),
+        "types": dict(types),
+        "story_scores": {
+            "min": scores[0],
+            "median": statistics.median(scores),
+            "mean": round(statistics.fmean(scores), 1),
+            "max": scores[-1],
+        }
+        if scores
+        else None,
+        "comments_received": sum(v.get("descendants") or 0 for v in stories),
+        "active_hours_utc": [h for h, _ in hours.most_common(5)],
+        "top_domains": dict(domains.most_common(5)),
+        "first_item": format_time(min(times)) if times else None,
+        "last_item": format_time(max(times)) if times else None,
+    }
+
+
+def html_to_text(text: str) -> str:
+    """Turn the HTML of an item's ``text`` field into plain text."""
+    text = re.sub(r"<p>", "\n", text)
+    text = re.sub(r"<[^>]+>", "", text)
+    return html.unescape(text).strip()
+
+
+async def crawl_comments(
+    story: dict,
+    max_depth: int = 3,
+    max_comments: int = 200,
+    time_budget: float = 10.0,
+    excerpt_len: int = 280,
+    concurrency: int = MAX_CONCURRENCY,
+) -> AsyncIterator[list[dict]]:
+    """Walk the comment tree of ``story`` breadth-first, yielding one level at a time.
+
+    Every level is fetched concurrently. Crawling stops once ``max_depth``
+    levels or ``max_comments`` comments have been produced, or when
+    ``time_budget`` seconds have elapsed; a level cut by the time budget is
+    dropped as a whole.
+
+    Yields:
+        list[dict]: Flattened comments of one level, with keys ``id``,
+        ``parent``, ``depth``, ``by``, ``text``, ``score`` and ``replies``.
+    """
+    deadline = time.monotonic() + time_budget
+
+    remaining = max_comments
+    frontier = story.get("kids", [])
+    depth = 1
+    while frontier and depth <= max_depth and remaining > 0:
+        budget = deadline - time.monotonic()
+        if budget <= 0:
+            return
+
+        try:
+            items = await asyncio.wait_for(
+                fetch_items(frontier[:remaining], concurrency), timeout=budget
+            )
+        except TimeoutError:
+            logger.warning(f"Comment crawl of story {story.get('id')} ran out of time")
+            return
+
+        level = []
+        next_frontier = []
+        for item in items:
+            if "error" in item or item.get("deleted") or item.get("dead"):
+                continue
+            text = html_to_text(item.get("text", ""))
+            level.append(
+                {
+                    "id": item["id"],
+                    "parent": item.get("parent"),
+                    "depth": depth,
+                    "by": item.get("by"),
+                    "text": text[:excerpt_len],
+                    "score": item.get("score"),
+                    "replies": len(item.get("kids", [])),
+                }
+            )
+            next_frontier.extend(item.get("kids", []))
+
+        remaining -= len(level)
+        yield level
+
+        frontier = next_frontier
+        depth += 1
+
 
 @tool
-def get_top_hackernews_stories(num_stories: int = 10) -> str:
+async def get_top_hackernews_stories(
+    num_stories: int = 10, fields: list[str] | None = None
+) -> str:
     """Use this function to get top stories from Hacker News.
 
     Args:
         num_stories (int): Number of stories to return. Defaults to 10.
+        fields (list[str] | None): Story fields to return, e.g. ["id", "title",
+            "score", "text"]. Defaults to id, title, by, score, descendants
+            (comment count), time and url.
 
     Returns:
-        str: JSON string of top stories.
+        str: CSV table of top stories in ranking order, with a header line.
     """
 
     logger.debug(f"Getting top {num_stories} stories from Hacker News")
 
+    fields = fields or STORY_FIELDS
+
     # Fetch top story IDs
-    response = httpx.get("https://hacker-news.firebaseio.com/v0/topstories.json")
-    story_ids = response.json()
-
-    # Fetch story details
-    stories = []
-    for story_id in story_ids[:num_stories]:
-        story_response = httpx.get(
-            f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-        )
-        story = story_response.json()
-        story["username"] = story["by"]
-        stories.append(story)
-    return json.dumps(stories)
+    story_ids = await fetch_top_story_ids()
+
+    # Fetch story details, ranking order is kept
+    stories = await fetch_items(story_ids[:num_stories])
+    if any("error" in v for v in stories):
+        fields = [*fields, "error"]
+    rows = [project(v, fields) for v in stories]
+    return log_payload("get_top_hackernews_stories", encode_rows(rows, fields))
 
 
 @tool
-def get_user_details(self, username: str) -> str:
+async def get_user_details(username: str) -> str:
     """Use this function to get the details of a Hacker News user using their username.
 
     Args:
@@ -49,16 +369,110 @@ def get_user_details(self, username: str) -> str:
 
     try:
         logger.debug(f"Getting details for user: {username}")
-        user = httpx.get(
-            f"https://hacker-news.firebaseio.com/v0/user/{username}.json"
-        ).json()
+        user = await fetch_user(username)
+        if user is None:
+            return f"Error getting user details: user '{username}' not found"
         user_details = {
-            "id": user.get("user_id"),
+            "id": user.get("id"),
             "karma": user.get("karma"),
             "about": user.get("about"),
             "total_items_submitted": len(user.get("submitted", [])),
         }
-        return json.dumps(user_details)
+        return log_payload("get_user_details", encode_json(user_details))
     except Exception as e:
         logger.exception(e)
         return f"Error getting user details: {e}"
+
+
+@tool
+async def get_story_comments(
+    story_id: int,
+    max_depth: int = 3,
+    max_comments: int = 100,
+    time_budget: float = 10.0,
+) -> str:
+    """Use this function to get the comment thread of a Hacker News story.
+
+    Args:
+        story_id (int): ID of the story.
+        max_depth (int): Max depth of replies to follow. Defaults to 3.
+        max_comments (int): Max number of comments to return. Defaults to 100.
+        time_budget (float): Max seconds to spend crawling. Defaults to 10.
+
+    Returns:
+        str: JSON string of the story header and its flattened comments,
+            ordered level by level.
+    """
+
+    try:
+        logger.debug(f"Getting comments for story: {story_id}")
+        (story,) = await fetch_items([story_id])
+        if "error" in story:
+            return f"Error getting story comments: {story['error']}"
+
+        comments = []
+        async for level in crawl_comments(
+            story, max_depth, max_comments, time_budget
+        ):
+            comments.extend(level)
+
+        out = {
+            "story": {
+                "id": story["id"],
+                "title": story.get("title"),
+                "by": story.get("by"),
+                "score": story.get("score"),
+                "descendants": story.get("descendants"),
+            },
+            "comments": comments,
+            "truncated": len(comments) < (story.get("descendants") or 0),
+        }
+        return log_payload("get_story_comments", encode_json(out))
+    except Exception as e:
+        logger.exception(e)
+        return f"Error getting story comments: {e}"
+
+
+@tool
+async def get_user_activity(
+    username: str, num_items: int = 100, time_budget: float = 15.0
+) -> str:
+    """Use this function to analyze the recent activity of a Hacker News user: stories
+    vs. comments, story score distribution, active hours and favorite domains.
+
+    Args:
+        username (str): Username of the user to analyze.
+        num_items (int): Number of most recent submissions to analyze, up to 500.
+            Defaults to 100.
+        time_budget (float): Max seconds to spend fetching submissions; the
+            profile covers what was fetched in time. Defaults to 15.
+
+    Returns:
+        str: JSON string of the user's activity profile, with ``truncated``
+            set if some submissions were not fetched within the time budget.
+    """
+
+    try:
+        logger.debug(f"Getting activity for user: {username}")
+        user = await fetch_user(username)
+        if user is None:
+            return f"Error getting user activity: user '{username}' not found"
+
+        # `submitted` 按时间倒序排列，截取最近的若干条
+        item_ids = user.get("submitted", [])[: min(num_items, MAX_USER_ITEMS)]
+        items = await fetch_items(item_ids, timeout=time_budget)
+        timed_out = sum(1 for v in items if v.get("error") == TIMED_OUT)
+        if timed_out:
+            logger.warning(f"Activity of user {username}: {timed_out} items timed out")
+
+        out = {
+            "id": user.get("id"),
+            "karma": user.get("karma"),
+            "total_items_submitted": len(user.get("submitted", [])),
+            **summarize_activity(items),
+            "truncated": timed_out > 0,
+        }
+        return log_payload("get_user_activity", encode_json(out))
+    except Exception as e:
+        logger.exception(e)
+        return f"Error getting user activity: {e}"
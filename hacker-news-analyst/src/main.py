@@ -1,10 +1,21 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
 from datetime import datetime
 
 from dotenv import load_dotenv
 from langchain.agents import create_agent
+from langchain.messages import AIMessageChunk
 
+import batch
+import cache
 import hackernews
 import llm
+import snapshot
+
+logger = logging.getLogger(__name__)
 
 # Define instructions for the agent
 INSTRUCTIONS = """You are an intelligent HackerNews analyst and tech news curator. Your capabilities include:
@@ -38,7 +49,15 @@ load_dotenv()
 model = llm.must_new_openai_like()
 
 # Initialize tools
-tools = [hackernews.get_top_hackernews_stories, hackernews.get_user_details]
+tools = [
+    hackernews.get_top_hackernews_stories,
+    hackernews.get_user_details,
+    hackernews.get_user_activity,
+    hackernews.get_story_comments,
+    snapshot.get_trending_stories,
+    snapshot.get_top_domains,
+    snapshot.get_story_history,
+]
 
 # Create the agent with enhanced capabilities
 agent = create_agent(
@@ -50,7 +69,68 @@ agent = create_agent(
 )
 
 
-def main():
+async def stream_answer(query: dict) -> dict:
+    """Stream the agent's answer to stdout as it is generated.
+
+    Tokens are printed as they arrive, tool calls are reported when the model
+    requests them and when they complete.
+
+    Returns:
+        dict: Latency metrics of the turn in seconds: ``ttft`` (time to the
+            first model token), ``tools`` (wall time spent in tool calls) and
+            ``total``.
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    tools_started = None
+    tool_time = 0.0
+
+    async for mode, chunk in agent.astream(query, stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            message, _ = chunk
+            if not isinstance(message, AIMessageChunk):
+                continue
+            if first_token_at is None and (message.text or message.tool_call_chunks):
+                first_token_at = time.perf_counter()
+            if message.text:
+                print(message.text, end="", flush=True)
+            continue
+
+        for node, update in chunk.items():
+            messages = (update or {}).get("messages", [])
+            if node == "model":
+                tool_calls = [c for m in messages for c in getattr(m, "tool_calls", [])]
+                for c in tool_calls:
+                    print(f"\n🔧 {c['name']}({json.dumps(c['args'])})", flush=True)
+                tools_started = time.perf_counter() if tool_calls else None
+            elif node == "tools" and tools_started is not None:
+                now = time.perf_counter()
+                tool_time += now - tools_started
+                tools_started = now
+                for m in messages:
+                    print(f"✅ {m.name} done", flush=True)
+
+    total = time.perf_counter() - started
+    return {
+        "ttft": (first_token_at - started) if first_token_at else None,
+        "tools": tool_time,
+        "total": total,
+    }
+
+
+def format_metrics(metrics: dict) -> str:
+    ttft = f"{metrics['ttft']:.2f}s" if metrics["ttft"] is not None else "-"
+    return (
+        f"⏱ TTFT {ttft} | tools {metrics['tools']:.2f}s | total {metrics['total']:.2f}s"
+    )
+
+
+def log_cache_stats():
+    store = cache.get_default()
+    logger.info(f"Cache: {store.stats}, hit rate {store.hit_rate():.1%}")
+
+
+async def main(stream: bool = True):
     print("🤖 Tech News Analyst is ready!")
     print("\nI can help you with:")
     print("1. Top stories and trends on HackerNews")
@@ -59,18 +139,59 @@ def main():
     print("4. Tech industry insights")
     print("\nType 'exit' to quit or ask me anything about tech news!")
 
-    while True:
-        user_input = input("\nYou: ").strip()
-        if user_input.lower() == "exit":
-            print("Goodbye! 👋")
-            break
-
-        # Add timestamp to the response
-        print(f"\n[{datetime.now().strftime('%H:%M:%S')}]")
-        query = {"messages": [{"role": "user", "content": user_input}]}
-        r = agent.invoke(query)
-        print(r["messages"][-1].content)
+    try:
+        while True:
+            user_input = input("\nYou: ").strip()
+            if user_input.lower() == "exit":
+                print("Goodbye! 👋")
+                break
+
+            # Add timestamp to the response
+            print(f"\n[{datetime.now().strftime('%H:%M:%S')}]")
+            query = {"messages": [{"role": "user", "content": user_input}]}
+            if stream:
+                metrics = await stream_answer(query)
+                print(f"\n\n{format_metrics(metrics)}")
+            else:
+                # 工具是异步实现的，需要走 ainvoke
+                r = await agent.ainvoke(query)
+                print(r["messages"][-1].content)
+    finally:
+        log_cache_stats()
+        await hackernews.aclose()
+
+
+async def main_batch(input_path: str, output_path: str, concurrency: int):
+    try:
+        summary = await batch.run(agent, input_path, output_path, concurrency)
+    finally:
+        log_cache_stats()
+        await hackernews.aclose()
+    print(json.dumps(summary, indent=2))
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Tech News Analyst")
+    parser.add_argument(
+        "--no-stream", action="store_true", help="等待完整回答后再输出，不流式打印"
+    )
+    parser.add_argument(
+        "--batch", metavar="QUESTIONS", help="批量模式：从 JSONL 文件读取问题并发回答"
+    )
+    parser.add_argument(
+        "--output", default="answers.jsonl", help="批量模式的输出文件，默认 answers.jsonl"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="批量模式的最大并发数，默认 4"
+    )
+    args = parser.parse_args()
+
+    FORMAT = "%(asctime)s - %(filename)s(%(lineno)d) - %(levelname)s: %(message)s"
+    logging.basicConfig(format=FORMAT, datefmt="%Y-%m-%d %H:%M:%S", level=logging.INFO)
+    # httpx 每个请求都会打一行 INFO 日志，淹没工具输出大小和缓存命中等统计
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.batch:
+        asyncio.run(main_batch(args.batch, args.output, args.concurrency))
+    else:
+        asyncio.run(main(stream=not args.no_stream))
@@ -0,0 +1,279 @@
+"""
+HackerNews 热门榜单的历史快照存储及趋势查询工具。
+
+定时把热门故事的排名、分数和评论数写入带索引的本地 SQLite 文件，趋势类问题
+（分数增速、排名变化、每日热门域名等）直接在本地用 SQL 窗口函数聚合回答，
+无需重新拉取线上数据。
+
+采集快照：
+
+    uv run src/snapshot.py --interval 900 --num-stories 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from langchain.tools import tool
+
+import hackernews
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(".cache", "snapshots.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    url TEXT,
+    domain TEXT,
+    by TEXT,
+    time INTEGER
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    taken_at INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    score INTEGER,
+    descendants INTEGER,
+    PRIMARY KEY (taken_at, id)
+);
+CREATE INDEX IF NOT EXISTS snapshots_id_taken_at ON snapshots (id, taken_at);
+"""
+
+
+class SnapshotStore:
+    """Indexed SQLite store of ranking snapshots.
+
+    Args:
+        path: SQLite file path.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 查询在线程池里执行，SQLite 连接需要加锁共享
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def add(self, taken_at: int, stories: list[dict]):
+        """Record ``stories``, in ranking order, as the snapshot taken at ``taken_at``."""
+        rows = []
+        headers = []
+        for rank, story in enumerate(stories, start=1):
+            if "error" in story:
+                continue
+            url = story.get("url")
+            headers.append(
+                (
+                    story["id"],
+                    story.get("title"),
+                    url,
+                    hackernews.domain_of(url),
+                    story.get("by"),
+                    story.get("time"),
+                )
+            )
+            rows.append(
+                (taken_at, rank, story["id"], story.get("score"), story.get("descendants"))
+            )
+
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO stories VALUES (?, ?, ?, ?, ?, ?)", headers
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def trending(self, since: int, limit: int = 10) -> list[dict]:
+        """Stories ranked by score velocity (points per hour) since ``since``."""
+        sql = """
+        WITH w AS (
+            SELECT id, taken_at, rank, score, descendants,
+                FIRST_VALUE(taken_at) OVER win AS first_at,
+                FIRST_VALUE(rank) OVER win AS first_rank,
+                FIRST_VALUE(score) OVER win AS first_score,
+                MIN(rank) OVER (PARTITION BY id) AS best_rank,
+                ROW_NUMBER() OVER (PARTITION BY id ORDER BY taken_at DESC) AS rn
+            FROM snapshots
+            WHERE taken_at >= ?
+            WINDOW win AS (PARTITION BY id ORDER BY taken_at)
+        )
+        SELECT w.id, s.title, s.domain,
+            w.first_rank, w.rank AS last_rank, w.best_rank,
+            w.first_score, w.score AS last_score, w.descendants AS comments,
+            ROUND((w.score - w.first_score) * 3600.0 / MAX(w.taken_at - w.first_at, 1), 1)
+                AS score_velocity
+        FROM w JOIN stories s ON s.id = w.id
+        WHERE w.rn = 1
+        ORDER BY score_velocity DESC, w.best_rank
+        LIMIT ?
+        """
+        return self._query(sql, (since, limit))
+
+    def top_domains(self, since: int, limit: int = 5) -> list[dict]:
+        """Top domains per day since ``since``, by number of ranked stories."""
+        sql = """
+        WITH daily AS (
+            SELECT date(taken_at, 'unixepoch') AS day, id, MAX(score) AS score
+            FROM snapshots
+            WHERE taken_at >= ?
+            GROUP BY day, id
+        ),
+        ranked AS (
+            SELECT daily.day, COALESCE(s.domain, 'news.ycombinator.com') AS domain,
+                COUNT(*) AS stories, SUM(daily.score) AS points,
+                ROW_NUMBER() OVER (
+                    PARTITION BY daily.day ORDER BY COUNT(*) DESC, SUM(daily.score) DESC
+                ) AS pos
+            FROM daily JOIN stories s ON s.id = daily.id
+            GROUP BY daily.day, domain
+        )
+        SELECT day, domain, stories, points FROM ranked
+        WHERE pos <= ?
+        ORDER BY day, pos
+        """
+        return self._query(sql, (since, limit))
+
+    def history(self, story_id: int) -> list[dict]:
+        """Rank, score and comment count of a story across snapshots."""
+        sql = """
+        SELECT datetime(taken_at, 'unixepoch') AS taken_at, rank, score, descendants AS comments
+        FROM snapshots WHERE id = ? ORDER BY taken_at
+        """
+        return self._query(sql, (story_id,))
+
+    def close(self):
+        self.db.close()
+
+    def _query(self, sql: str, params: tuple) -> list[dict]:
+        with self.lock:
+            return [dict(v) for v in self.db.execute(sql, params)]
+
+
+_default: SnapshotStore | None = None
+
+
+def get_default() -> SnapshotStore:
+    """Return the process-wide store, opened lazily at ``HACKERNEWS_SNAPSHOT_PATH``."""
+    global _default
+
+    if _default is None:
+        _default = SnapshotStore(
+            os.environ.get("HACKERNEWS_SNAPSHOT_PATH", DEFAULT_PATH)
+        )
+    return _default
+
+
+async def take_snapshot(store: SnapshotStore, num_stories: int = 100) -> int:
+    """Fetch the live ranking and record it. Returns the number of stories stored."""
+    story_ids = await hackernews.fetch_json("/topstories.json")
+    stories = await hackernews.fetch_items(story_ids[:num_stories], use_cache=False)
+    await asyncio.to_thread(store.add, int(time.time()), stories)
+    return sum(1 for v in stories if "error" not in v)
+
+
+async def ingest(store: SnapshotStore, interval: float, num_stories: int):
+    """Take a snapshot every ``interval`` seconds until cancelled."""
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                n = await take_snapshot(store, num_stories)
+                logger.info(f"Stored snapshot of {n} stories")
+            except Exception as e:
+                logger.exception(e)
+            await asyncio.sleep(max(interval - (time.monotonic() - started), 0))
+    finally:
+        await hackernews.aclose()
+
+
+@tool
+async def get_trending_stories(hours: float = 24, limit: int = 10) -> str:
+    """Use this function to find stories that trended on Hacker News over a past period,
+    based on locally recorded ranking snapshots.
+
+    Args:
+        hours (float): Size of the look-back window in hours. Defaults to 24.
+        limit (int): Number of stories to return. Defaults to 10.
+
+    Returns:
+        str: CSV table of stories ordered by score velocity (points per hour),
+            with their first, last and best rank in the window.
+    """
+
+    since = int(time.time() - hours * 3600)
+    rows = await asyncio.to_thread(get_default().trending, since, limit)
+    return hackernews.log_payload("get_trending_stories", hackernews.encode_rows(rows))
+
+
+@tool
+async def get_top_domains(days: int = 7, limit: int = 5) -> str:
+    """Use this function to get the most frequent domains among Hacker News top stories
+    for each day of a past period, based on locally recorded ranking snapshots.
+
+    Args:
+        days (int): Number of past days to cover. Defaults to 7.
+        limit (int): Number of domains per day. Defaults to 5.
+
+    Returns:
+        str: CSV table of per-day domains with story counts and total points.
+    """
+
+    since = int(time.time() - days * 24 * 3600)
+    rows = await asyncio.to_thread(get_default().top_domains, since, limit)
+    return hackernews.log_payload("get_top_domains", hackernews.encode_rows(rows))
+
+
+@tool
+async def get_story_history(story_id: int) -> str:
+    """Use this function to get how the rank, score and comment count of a Hacker News
+    story evolved over time, based on locally recorded ranking snapshots.
+
+    Args:
+        story_id (int): ID of the story.
+
+    Returns:
+        str: CSV table of the story's snapshots in time order.
+    """
+
+    rows = await asyncio.to_thread(get_default().history, story_id)
+    return hackernews.log_payload("get_story_history", hackernews.encode_rows(rows))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="定时采集 HackerNews 热门榜单快照")
+    parser.add_argument(
+        "--interval", type=float, default=900, help="采集间隔（秒），默认 900"
+    )
+    parser.add_argument(
+        "--num-stories", type=int, default=100, help="每次采集的故事数，默认 100"
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="只采集一次后退出"
+    )
+    args = parser.parse_args()
+
+    FORMAT = "%(asctime)s - %(filename)s(%(lineno)d) - %(levelname)s: %(message)s"
+    logging.basicConfig(format=FORMAT, datefmt="%Y-%m-%d %H:%M:%S", level=logging.INFO)
+
+    store = get_default()
+    if args.once:
+
+        async def once():
+            try:
+                return await take_snapshot(store, args.num_stories)
+            finally:
+                await hackernews.aclose()
+
+        logger.info(f"Stored snapshot of {asyncio.run(once())} stories")
+    else:
+        asyncio.run(ingest(store, args.interval, args.num_stories))
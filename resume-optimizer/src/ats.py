@@ -0,0 +1,246 @@
+"""
+本地的 ATS 关键词覆盖率评分，不调用大模型。
+
+从岗位描述中抽取技能词和短语，与简历分块做两级匹配。英文只抽取技术词：带大写字母、数字或
++#./ 的词（Python、AWS、C++、Node.js），常见的小写技术词，以及相邻大写词组成的短语（Spring
+Boot）和常见的多词技能（machine learning），其余的英文词都视为描述性的文字：先做精确匹配，余下的关键词
+用向量相似度和缓存的分块向量一次矩阵运算完成匹配。生成的覆盖率报告可以直接展示，
+也可以拼进 ATS 优化的提示词。
+"""
+
+import re
+import threading
+
+import numpy as np
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+# 关键词与简历分块的余弦相似度达到该值即视为语义匹配
+SIMILARITY_THRESHOLD = 0.6
+MAX_KEYWORDS = 60
+
+# 英文技术词，如 Python、C++、C#、Node.js、CI/CD
+ENGLISH_TERM = re.compile(r"[A-Za-z][A-Za-z0-9+#.]*(?:/[A-Za-z][A-Za-z0-9+#.]*)*")
+# 带这些字符的英文词几乎都是技术词，如 C++、Node.js、CI/CD、K8s
+TECH_CHARS = re.compile(r"[0-9+#./]")
+# 相邻的大写词最多合并成几个词的短语
+MAX_PHRASE_WORDS = 3
+# 中文短语的分隔符
+SEPARATORS = re.compile(r"[\s，,。.；;、：:！!？?（）()【】\[\]“”\"'《》/\-—·]+|以及|或者|和|及|与|或|等")
+# 描述性的前缀和后缀，去掉后剩下的才是技能本身
+PREFIXES = re.compile(
+    r"^(?:熟练掌握|熟练使用|熟练|熟悉|掌握|精通|了解|具备|具有|拥有|负责|参与|能够|有|对|"
+    r"优先|较强的|良好的|丰富的|扎实的|相关)+"
+)
+SUFFIXES = re.compile(r"(?:者优先|优先|经验|能力|背景|以上|相关)+$")
+CJK_STOPWORDS = {"岗位要求", "任职要求", "岗位职责", "工作职责", "职位描述", "职位要求", "加分项"}
+# 跟在英文词后面的泛称，如“R 语言”、“Spring 框架”去掉英文后剩下的部分，单独不成技能
+CJK_GENERIC = {"语言", "框架", "开发", "编程", "技术", "工具", "平台", "系统", "库", "工作"}
+# 句首或标题里大写的虚词和招聘套话，不是技能
+ENGLISH_STOPWORDS = set(
+    """
+    a about above after again all also an and any are as at be because been before being
+    below between both but by can could did do does doing down during each either etc e.g
+    few for from further had has have having he her here hers him his how i i.e if in into
+    is it its itself just least less many may me might more most much must my no nor not
+    now of off on once one only or other our ours out over own per plus same she should so
+    some such than that the their theirs them then there these they this those through to
+    too under until up upon us very via was we well were what when where which while who
+    whom why will with within without would yet you your yours
+    ability able across advantage applicant apply benefits bonus build building candidate
+    candidates collaborate company competitive culture degree demonstrated design develop
+    developing equivalent excellent experience experienced familiar familiarity good great
+    help ideal join knowledge looking maintain member mission nice offer opportunity
+    preferred proficiency proficient proven qualifications related required requirements
+    responsibilities responsible role salary senior skills solid strong support team teams
+    understanding work working year years junior lead manage minimum position job
+    engineer engineers engineering developer developers
+    """.split()
+)
+# 常见的小写技术词，职位描述里不一定大写
+TECH_TERMS = {
+    "python", "java", "javascript", "typescript", "golang", "rust", "kotlin", "swift",
+    "scala", "ruby", "php", "perl", "sql", "nosql", "mysql", "postgresql", "redis",
+    "mongodb", "kafka", "spark", "hadoop", "docker", "kubernetes", "terraform", "ansible",
+    "linux", "git", "react", "vue", "angular", "django", "flask", "fastapi", "spring",
+    "pytorch", "tensorflow", "pandas", "numpy", "graphql", "grpc", "microservices",
+    "devops", "agile", "scrum", "aws", "gcp", "azure", "elasticsearch", "nginx", "html",
+    "css", "llm", "nlp", "etl",
+}
+# 常见的多词技能，不区分大小写匹配
+TECH_PHRASES = (
+    "machine learning", "deep learning", "reinforcement learning", "computer vision",
+    "natural language processing", "data analysis", "data engineering", "data science",
+    "data structures", "distributed systems", "system design", "unit testing",
+    "test automation", "continuous integration", "continuous delivery", "cloud computing",
+    "object oriented programming", "functional programming", "web development",
+    "mobile development", "version control", "project management", "product management",
+    "large language models", "prompt engineering",
+)
+
+# (向量模型, 关键词) -> 归一化后的向量
+_keyword_vectors: dict[tuple[str, str], np.ndarray] = {}
+_keyword_vectors_lock = threading.Lock()
+
+
+def is_tech_term(term: str) -> bool:
+    """Whether an English word looks like a skill rather than prose."""
+    lowered = term.lower()
+    if len(term) < 2 or lowered in ENGLISH_STOPWORDS:
+        return False
+    return bool(TECH_CHARS.search(term)) or term != lowered or lowered in TECH_TERMS
+
+
+def english_keywords(text: str) -> list[tuple[int, str]]:
+    """English skill terms and phrases of ``text`` with their positions."""
+    found = []
+    covered = set()
+    lowered = text.lower()
+    for phrase in TECH_PHRASES:
+        for m in re.finditer(rf"(?<![a-z0-9+#]){re.escape(phrase)}(?![a-z0-9+#])", lowered):
+            found.append((m.start(), text[m.start() : m.end()]))
+            covered.update(range(m.start(), m.end()))
+
+    # 只用空格隔开的大写词合并成短语，如 Spring Boot、Google Cloud Platform
+    run: list[re.Match] = []
+
+    def flush():
+        if run:
+            found.append((run[0].start(), " ".join(v.group().rstrip(".") for v in run)))
+            run.clear()
+
+    for m in ENGLISH_TERM.finditer(text):
+        term = m.group().rstrip(".")
+        if m.start() in covered or not is_tech_term(term):
+            flush()
+            continue
+        word = term.isalpha() and term[0].isupper()
+        joinable = (
+            word
+            and run
+            and len(run) < MAX_PHRASE_WORDS
+            and text[run[-1].end() : m.start()] == " "
+        )
+        if not joinable:
+            flush()
+        run.append(m)
+        if not word:
+            flush()
+    flush()
+    return found
+
+
+def extract_keywords(job_description: str, limit: int = MAX_KEYWORDS) -> list[str]:
+    """Extract skill terms and phrases from a job description, in order of appearance."""
+    keywords = [k for _, k in sorted(english_keywords(job_description))]
+
+    # 英文词已经单独抽出，中文短语里不再包含它们
+    cjk_text = ENGLISH_TERM.sub(" ", job_description)
+    for segment in SEPARATORS.split(cjk_text):
+        segment = SUFFIXES.sub("", PREFIXES.sub("", segment.strip()))
+        if segment in CJK_STOPWORDS or segment in CJK_GENERIC:
+            continue
+        if 2 <= len(segment) <= 12 and re.search(r"[一-鿿]", segment):
+            keywords.append(segment)
+
+    seen = set()
+    out = []
+    for k in keywords:
+        if k.lower() not in seen:
+            seen.add(k.lower())
+            out.append(k)
+    return out[:limit]
+
+
+def contains(text: str, keyword: str) -> bool:
+    """Whether lowercased ``text`` mentions ``keyword``. English terms must match a
+    whole term, so that "Java" is not found in "JavaScript" nor "Go" in "Google";
+    Chinese keywords are matched as substrings since Chinese has no word boundaries."""
+    keyword = keyword.lower()
+    if re.search(r"[一-鿿]", keyword):
+        return keyword in text
+    return re.search(rf"(?<![a-z0-9+#]){re.escape(keyword)}(?![a-z0-9+#])", text) is not None
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def embed_keywords(
+    keywords: list[str], embed_model: BaseEmbedding, embedding_model: str
+) -> np.ndarray:
+    """Normalized embeddings of ``keywords``, only embedding those not seen before."""
+    with _keyword_vectors_lock:
+        missing = [k for k in keywords if (embedding_model, k) not in _keyword_vectors]
+    if missing:
+        vectors = normalize(np.asarray(embed_model.get_text_embedding_batch(missing)))
+        with _keyword_vectors_lock:
+            for k, v in zip(missing, vectors):
+                _keyword_vectors[(embedding_model, k)] = v
+    with _keyword_vectors_lock:
+        return np.stack([_keyword_vectors[(embedding_model, k)] for k in keywords])
+
+
+def chunk_matrix(index: VectorStoreIndex) -> tuple[list[str], np.ndarray]:
+    """Texts and normalized embeddings of the resume chunks stored in ``index``."""
+    embeddings = index.vector_store.data.embedding_dict
+    node_ids = list(embeddings)
+    texts = [index.docstore.get_node(v).get_content() for v in node_ids]
+    return texts, normalize(np.asarray([embeddings[v] for v in node_ids]))
+
+
+def score(
+    job_description: str,
+    index: VectorStoreIndex,
+    embed_model: BaseEmbedding,
+    embedding_model: str,
+    threshold: float = SIMILARITY_THRESHOLD,
+) -> dict:
+    """Score how well the resume in ``index`` covers the job description's keywords.
+
+    Returns:
+        dict: ``coverage`` (0-1), ``exact`` and ``semantic`` matches, ``missing``
+            keywords and the number of ``keywords`` extracted.
+    """
+    keywords = extract_keywords(job_description)
+    texts, chunks = chunk_matrix(index)
+    resume_text = "\n".join(texts).lower()
+
+    exact = [k for k in keywords if contains(resume_text, k)]
+    rest = [k for k in keywords if not contains(resume_text, k)]
+
+    semantic = []
+    missing = rest
+    if rest and len(texts):
+        # 关键词 × 分块的相似度矩阵，一次矩阵乘法完成全部匹配
+        similarity = embed_keywords(rest, embed_model, embedding_model) @ chunks.T
+        best = similarity.max(axis=1)
+        matched = best >= threshold
+        semantic = [
+            {"keyword": k, "similarity": round(float(s), 3)}
+            for k, s, m in zip(rest, best, matched)
+            if m
+        ]
+        missing = [k for k, m in zip(rest, matched) if not m]
+
+    matched_count = len(exact) + len(semantic)
+    return {
+        "keywords": len(keywords),
+        "coverage": round(matched_count / len(keywords), 3) if keywords else 1.0,
+        "exact": exact,
+        "semantic": semantic,
+        "missing": missing,
+    }
+
+
+def format_report(report: dict) -> str:
+    """Render a coverage report for the optimization prompt."""
+    semantic = "、".join(v["keyword"] for v in report["semantic"]) or "无"
+    return (
+        f"本地 ATS 关键词覆盖率：{report['coverage']:.0%}（共 {report['keywords']} 个关键词）\n"
+        f"精确命中：{'、'.join(report['exact']) or '无'}\n"
+        f"语义相近：{semantic}\n"
+        f"缺失关键词：{'、'.join(report['missing']) or '无'}\n"
+        "请重点说明如何在简历中自然地补充缺失关键词，并把语义相近的表述改为职位描述中的原词。"
+    )
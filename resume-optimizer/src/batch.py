@@ -0,0 +1,204 @@
+"""
+无界面的批量简历优化：简历目录 × 岗位描述 JSONL 的组合矩阵，走与页面相同的 RAG 流程。
+
+每份简历只加载、建索引和分析一次，供它的所有岗位复用；各组合由受限并发的协程池
+执行，结果和耗时按完成顺序写入 JSONL。
+
+岗位描述文件每行一个岗位，形如 ``{"id": "jd1", "title": "...", "description": "..."}``。
+
+    uv run src/batch.py --resumes resumes/ --jobs jobs.jsonl --out results.jsonl --workers 8
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+from llama_index.core import Settings
+
+import ats
+import index_cache
+import pdf
+import rag
+
+logger = logging.getLogger(__name__)
+
+
+def load_jobs(path: str) -> list[dict]:
+    """Read job descriptions from a JSONL file, numbering those without an ``id``."""
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line)
+            job.setdefault("id", str(i))
+            jobs.append(job)
+    return jobs
+
+
+def list_resumes(path: str) -> list[str]:
+    return sorted(
+        os.path.join(path, v) for v in os.listdir(path) if v.lower().endswith(".pdf")
+    )
+
+
+class Batch:
+    """Runs the resume × job × optimization matrix with at most ``workers``
+    LLM generations in flight.
+
+    Resumes are prepared lazily and once: the first job of a resume loads it,
+    gets its index from the index cache and analyzes it, and every other job
+    of that resume awaits the same preparation.
+    """
+
+    def __init__(self, embedding_model: str, generative_model: str, workers: int):
+        self.embedding_model = embedding_model
+        self.generative_model = generative_model
+        self.semaphore = asyncio.Semaphore(workers)
+        self.prepared: dict[str, asyncio.Task] = {}
+
+    async def _prepare(self, path: str) -> dict:
+        started = time.perf_counter()
+        with open(path, "rb") as f:
+            data = f.read()
+        documents = await asyncio.to_thread(pdf.load_pdf, data, os.path.basename(path))
+        resume_hash = index_cache.content_hash(documents)
+        index = await asyncio.to_thread(
+            rag.prepare_index,
+            documents,
+            self.embedding_model,
+            self.generative_model,
+            resume_hash,
+        )
+        indexed = time.perf_counter()
+
+        async with self.semaphore:
+            analysis = await rag.aanalyze(index, resume_hash, self.generative_model)
+        return {
+            "index": index,
+            "analysis": analysis,
+            "timings": {
+                "index": round(indexed - started, 3),
+                "analysis": round(time.perf_counter() - indexed, 3),
+            },
+        }
+
+    def prepare(self, path: str) -> asyncio.Task:
+        if path not in self.prepared:
+            self.prepared[path] = asyncio.create_task(self._prepare(path))
+        return self.prepared[path]
+
+    async def run_one(self, path: str, job: dict, optimization: str) -> dict:
+        out = {
+            "resume": os.path.basename(path),
+            "job_id": job["id"],
+            "optimization": optimization,
+        }
+        started = time.perf_counter()
+        try:
+            resume = await self.prepare(path)
+            query_text = rag.OPTIMIZATIONS[optimization]
+            if optimization == rag.ATS_OPTIMIZATION:
+                report = await asyncio.to_thread(
+                    ats.score,
+                    job["description"],
+                    resume["index"],
+                    Settings.embed_model,
+                    self.embedding_model,
+                )
+                out["ats"] = report
+                query_text += "\n\n" + ats.format_report(report)
+            async with self.semaphore:
+                generated = time.perf_counter()
+                prompt = rag.optimization_prompt(
+                    resume["analysis"],
+                    query_text,
+                    job.get("title", ""),
+                    job["description"],
+                )
+                out["suggestions"] = await rag.aquery(resume["index"], prompt)
+            out["timings"] = {
+                **resume["timings"],
+                "suggestion": round(time.perf_counter() - generated, 3),
+            }
+        except Exception as e:
+            logger.exception(e)
+            out["error"] = str(e)
+        out["latency"] = round(time.perf_counter() - started, 3)
+        return out
+
+
+async def run(args) -> dict:
+    resumes = list_resumes(args.resumes)
+    jobs = load_jobs(args.jobs)
+    optimizations = list(rag.OPTIMIZATIONS) if "all" in args.optimizations else args.optimizations
+
+    batch = Batch(args.embedding_model, args.generative_model, args.workers)
+    tasks = [
+        batch.run_one(path, job, optimization)
+        for path in resumes
+        for job in jobs
+        for optimization in optimizations
+    ]
+    logger.info(
+        f"{len(resumes)} resumes × {len(jobs)} jobs × {len(optimizations)} optimizations"
+    )
+
+    started = time.perf_counter()
+    latencies = []
+    failed = 0
+    with open(args.out, "w", encoding="utf-8") as f:
+        for done in asyncio.as_completed(tasks):
+            r = await done
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            f.flush()
+
+            latencies.append(r["latency"])
+            if "error" in r:
+                failed += 1
+            logger.info(
+                f"[{len(latencies)}/{len(tasks)}] {r['resume']} × {r['job_id']} "
+                f"({r['optimization']}) {r['latency']:.2f}s"
+            )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "runs": len(tasks),
+        "failed": failed,
+        "workers": args.workers,
+        "wall_time": round(elapsed, 2),
+        "runs_per_minute": round(len(tasks) * 60 / elapsed, 2) if elapsed else None,
+        "latency_p50": statistics.median(latencies) if latencies else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量简历优化")
+    parser.add_argument("--resumes", required=True, help="存放 PDF 简历的目录")
+    parser.add_argument("--jobs", required=True, help="岗位描述的 JSONL 文件")
+    parser.add_argument("--out", default="results.jsonl", help="结果输出文件，默认 results.jsonl")
+    parser.add_argument(
+        "--optimizations",
+        nargs="+",
+        default=[rag.ATS_OPTIMIZATION],
+        choices=[*rag.OPTIMIZATIONS, "all"],
+        help="优化类型，all 表示全部，默认 ATS关键词优化器",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="并发生成的上限，默认 4")
+    parser.add_argument("--generative-model", default="qwen3-max", help="大模型")
+    parser.add_argument("--embedding-model", default="text-embedding-v4", help="文本向量模型")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    FORMAT = "%(asctime)s - %(filename)s(%(lineno)d) - %(levelname)s: %(message)s"
+    logging.basicConfig(format=FORMAT, datefmt="%Y-%m-%d %H:%M:%S", level=logging.INFO)
+
+    summary = asyncio.run(run(args))
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,250 @@
+"""
+并发、感知限流的向量化流水线。
+
+相同文本的分块只向量化一次；批次并发发送，批大小和并发度按服务端反馈自适应调整：
+遇到 429 限流时二者减半，延迟超过目标时降低并发度，连续成功后再逐步加回来。
+失败的批次以指数退避加随机抖动重试。
+
+同一个向量模型的所有建索引调用共用一条流水线（见 ``get_pipeline``），限流状态和
+并发额度在并发构建之间共享，不会每次构建都从头试探。
+
+向量化完成后直接以带向量的节点建索引，``VectorStoreIndex`` 不会再重复向量化。
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import BaseNode, Document, MetadataMode
+
+logger = logging.getLogger(__name__)
+
+# 并发额度被其他调用占满时，重新检查的间隔（秒）
+SLOT_POLL_INTERVAL = 0.05
+
+
+def is_rate_limited(e: Exception) -> bool:
+    """Whether ``e`` is a provider 429, as raised by the OpenAI-compatible client."""
+    status = getattr(e, "status_code", None) or getattr(
+        getattr(e, "response", None), "status_code", None
+    )
+    return status == 429 or e.__class__.__name__ == "RateLimitError"
+
+
+class EmbeddingPipeline:
+    """Embeds texts in concurrent batches, adapting to provider feedback.
+
+    The pipeline may be shared by concurrent callers, each running its own
+    event loop in its own thread: batch size, parallelism and the batches in
+    flight are accounted across all of them.
+
+    Args:
+        embed_model: Model used to embed each batch.
+        max_batch_size: Upper bound of the batch size. Defaults to the model's
+            ``embed_batch_size``, which is the provider's per-request limit.
+        max_parallelism: Upper bound of batches in flight.
+        target_latency: Batches slower than this many seconds reduce parallelism.
+        max_retries: Attempts per batch beyond the first before giving up.
+        backoff: Base delay in seconds of the exponential backoff.
+        max_backoff: Cap of the backoff delay in seconds.
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        max_batch_size: int | None = None,
+        max_parallelism: int = 8,
+        target_latency: float = 5.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ):
+        self.embed_model = embed_model
+        self.max_batch_size = max_batch_size or embed_model.embed_batch_size
+        self.max_parallelism = max_parallelism
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.batch_size = self.max_batch_size
+        self.parallelism = min(4, max_parallelism)
+        self.successes = 0
+        # 所有调用方合计在途的批次数，不超过 parallelism
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        # 最近一次完成的 aembed 的统计
+        self.metrics = {}
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        """Embed ``texts``, returning one vector per text in input order."""
+        started = time.perf_counter()
+        unique = list(dict.fromkeys(texts))
+        metrics = {
+            "chunks": len(texts),
+            "unique_chunks": len(unique),
+            "requests": 0,
+            "rate_limited": 0,
+            "retries": 0,
+        }
+
+        vectors: dict[str, list[float]] = {}
+        # (待向量化文本, 已重试次数)
+        pending = deque((t, 0) for t in unique)
+        in_flight: dict[asyncio.Task, list[tuple[str, int]]] = {}
+
+        try:
+            while pending or in_flight:
+                while pending and self._acquire():
+                    n = min(self.batch_size, len(pending))
+                    batch = [pending.popleft() for _ in range(n)]
+                    attempt = max(v[1] for v in batch)
+                    task = asyncio.create_task(
+                        self._send([v[0] for v in batch], attempt, metrics)
+                    )
+                    in_flight[task] = batch
+
+                if not in_flight:
+                    # 并发额度被其他调用占满了
+                    await asyncio.sleep(SLOT_POLL_INTERVAL)
+                    continue
+
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    batch = in_flight.pop(task)
+                    self._release()
+                    try:
+                        embeddings, latency = task.result()
+                    except Exception as e:
+                        self._on_failure(e, batch, pending, metrics)
+                        continue
+                    vectors.update(zip((v[0] for v in batch), embeddings))
+                    self._on_success(latency)
+        finally:
+            for task in in_flight:
+                task.cancel()
+                self._release()
+
+        elapsed = time.perf_counter() - started
+        metrics.update(
+            {
+                "elapsed": round(elapsed, 3),
+                "chunks_per_second": round(len(unique) / elapsed, 1) if elapsed else None,
+                "batch_size": self.batch_size,
+                "parallelism": self.parallelism,
+            }
+        )
+        self.metrics = metrics
+        logger.info(f"Embedded chunks: {metrics}")
+        return [vectors[t] for t in texts]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """Synchronous :meth:`aembed`, usable whether or not a loop is running."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aembed(texts))
+
+        # 已经处在事件循环里（例如 Streamlit 页面里的 asyncio.run），换个线程跑
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self.aembed(texts)).result()
+
+    def _acquire(self) -> bool:
+        with self.lock:
+            if self.in_flight >= self.parallelism:
+                return False
+            self.in_flight += 1
+            return True
+
+    def _release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    async def _send(self, texts: list[str], attempt: int, metrics: dict) -> tuple[list, float]:
+        if attempt:
+            delay = min(self.max_backoff, self.backoff * 2**attempt)
+            await asyncio.sleep(random.uniform(0, delay))
+
+        metrics["requests"] += 1
+        started = time.perf_counter()
+        embeddings = await self.embed_model.aget_text_embedding_batch(texts)
+        return embeddings, time.perf_counter() - started
+
+    def _on_success(self, latency: float):
+        with self.lock:
+            if latency > self.target_latency:
+                self.parallelism = max(1, self.parallelism - 1)
+                self.successes = 0
+                return
+
+            # 连续成功一轮后先恢复批大小，再加性地增加并发度
+            self.successes += 1
+            if self.successes >= self.parallelism:
+                self.successes = 0
+                if self.batch_size < self.max_batch_size:
+                    self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+                elif self.parallelism < self.max_parallelism:
+                    self.parallelism += 1
+
+    def _on_failure(
+        self, e: Exception, batch: list[tuple[str, int]], pending: deque, metrics: dict
+    ):
+        attempt = max(v[1] for v in batch) + 1
+        if attempt > self.max_retries:
+            raise e
+
+        metrics["retries"] += 1
+        if is_rate_limited(e):
+            metrics["rate_limited"] += 1
+            with self.lock:
+                self.successes = 0
+                self.parallelism = max(1, self.parallelism // 2)
+                self.batch_size = max(1, self.batch_size // 2)
+            logger.warning(
+                f"Rate limited, batch size -> {self.batch_size}, parallelism -> {self.parallelism}"
+            )
+        else:
+            with self.lock:
+                self.successes = 0
+            logger.warning(f"Embedding batch failed (attempt {attempt}): {e!r}")
+        pending.extendleft((t, attempt) for t, _ in reversed(batch))
+
+
+_pipelines: dict[str, EmbeddingPipeline] = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_pipeline(embed_model: BaseEmbedding) -> EmbeddingPipeline:
+    """Return the process-wide pipeline of ``embed_model``, keyed by model name,
+    so that concurrent index builds share its rate-limit state."""
+    with _pipelines_lock:
+        pipeline = _pipelines.get(embed_model.model_name)
+        if pipeline is None:
+            pipeline = EmbeddingPipeline(embed_model)
+            _pipelines[embed_model.model_name] = pipeline
+        return pipeline
+
+
+def build_index(
+    documents: list[Document],
+    embed_model: BaseEmbedding,
+    pipeline: EmbeddingPipeline | None = None,
+) -> VectorStoreIndex:
+    """Split ``documents`` like ``VectorStoreIndex.from_documents`` does, embed the
+    chunks through ``pipeline`` (the shared one of ``embed_model`` by default)
+    and build the index from the embedded nodes."""
+    pipeline = pipeline or get_pipeline(embed_model)
+
+    nodes: list[BaseNode] = run_transformations(documents, Settings.transformations)
+    texts = [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+    for node, vector in zip(nodes, pipeline.embed(texts)):
+        node.embedding = vector
+
+    return VectorStoreIndex(nodes, embed_model=embed_model)
@@ -0,0 +1,156 @@
+"""
+简历向量索引的持久化缓存。
+
+索引按“简历内容哈希 + 向量模型名”落盘，同一份简历切换优化类型、岗位描述或者
+重启会话后都直接复用，不再重新调用远程向量化接口。缓存按总大小和存活时间淘汰。
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+
+from llama_index.core import StorageContext, VectorStoreIndex, load_index_from_storage
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import Document
+
+import embedding
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.path.join(".cache", "indexes")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+
+def content_hash(documents: list[Document]) -> str:
+    """Hash the text of ``documents``, identifying a resume independently of its file name."""
+    h = hashlib.sha256()
+    for d in documents:
+        h.update(d.text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            total += os.path.getsize(os.path.join(root, f))
+    return total
+
+
+class IndexCache:
+    """Vector indexes persisted on disk and memoized in memory.
+
+    Args:
+        root: Directory holding one sub-directory per index.
+        max_bytes: Max total size on disk; least recently used indexes are
+            evicted beyond it.
+        max_age: Indexes unused for longer than this many seconds are evicted.
+    """
+
+    def __init__(
+        self,
+        root: str = DEFAULT_ROOT,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.indexes: dict[str, VectorStoreIndex] = {}
+        # Streamlit 的每个会话跑在独立线程里。self.lock 只保护内存状态，
+        # 建索引时持有的是每个键各自的锁，不同简历可以同时建索引
+        self.lock = threading.Lock()
+        self.key_locks: dict[str, threading.Lock] = {}
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(resume_hash: str, embedding_model: str) -> str:
+        return hashlib.sha256(f"{embedding_model}\0{resume_hash}".encode()).hexdigest()[:32]
+
+    def get_or_build(
+        self,
+        documents: list[Document],
+        embedding_model: str,
+        embed_model: BaseEmbedding,
+        resume_hash: str | None = None,
+    ) -> VectorStoreIndex:
+        """Return the index of ``documents`` for ``embedding_model``, building and
+        persisting it only on a miss."""
+        key = self.key(resume_hash or content_hash(documents), embedding_model)
+        path = os.path.join(self.root, key)
+
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self.lock:
+                index = self.indexes.get(key)
+            if index is not None:
+                self._touch(path)
+                return index
+
+            if os.path.isdir(path):
+                try:
+                    storage = StorageContext.from_defaults(persist_dir=path)
+                    index = load_index_from_storage(storage, embed_model=embed_model)
+                    logger.info(f"Loaded index {key} from disk")
+                except Exception as e:
+                    logger.warning(f"Discarding unreadable index {key}: {e!r}")
+                    shutil.rmtree(path, ignore_errors=True)
+
+            if index is None:
+                started = time.perf_counter()
+                index = embedding.build_index(documents, embed_model)
+                index.storage_context.persist(persist_dir=path)
+                logger.info(
+                    f"Built index {key} in {time.perf_counter() - started:.2f}s"
+                )
+
+            self._touch(path)
+            with self.lock:
+                self.indexes[key] = index
+                self._evict(keep=key)
+            return index
+
+    def _touch(self, path: str):
+        if os.path.isdir(path):
+            os.utime(path)
+
+    def _evict(self, keep: str):
+        """Drop indexes past ``max_age``, then the least recently used ones
+        until the cache fits in ``max_bytes``."""
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                entries.append((os.path.getmtime(path), dir_size(path), name, path))
+        entries.sort()
+
+        now = time.time()
+        total = sum(v[1] for v in entries)
+        for mtime, size, name, path in entries:
+            if name == keep:
+                continue
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            self.indexes.pop(name, None)
+            total -= size
+            logger.info(f"Evicted index {name}")
+
+
+_default: IndexCache | None = None
+
+
+def get_default() -> IndexCache:
+    """Return the process-wide cache rooted at ``RESUME_INDEX_CACHE_DIR``."""
+    global _default
+
+    if _default is None:
+        _default = IndexCache(os.environ.get("RESUME_INDEX_CACHE_DIR", DEFAULT_ROOT))
+    return _default
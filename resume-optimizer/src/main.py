@@ -1,100 +1,131 @@
 import streamlit as st
-import os
-from llama_index.core import SimpleDirectoryReader, Settings, VectorStoreIndex
 
 from dotenv import load_dotenv
-import tempfile
-import shutil
-import base64
-# from PyPDF2 import PdfReader
+import asyncio
+from llama_index.core import Settings
 
-import model
+import ats
+import index_cache
+import pdf
+import rag
 
 # 加载环境变量
 load_dotenv()
 
 
-def run_rag_completion(
-    documents,
-    query_text: str,
-    job_title: str,
-    job_description: str,
-    embedding_model: str,
-    generative_model: str,
-) -> str:
-    """Run RAG completion using Nebius models for resume optimization."""
-    llm = model.must_new_openai_like(generative_model)
-    embed_model = model.must_new_openai_like_embedding(embedding_model)
-
-    Settings.llm = llm
-    Settings.embed_model = embed_model
-
-    # Step 1: Analyze the resume
-    analysis_prompt = f"""
-    详细分析这份简历。重点关注：
-    1. 关键技能和专业能力
-    2. 工作经验和成就
-    3. 教育背景和认证
-    4. 重要项目或成就
-    5. 职业发展轨迹和空缺期
-    
-    请以要点形式提供简洁的分析。
-    """
-
-    index = VectorStoreIndex.from_documents(documents)
-    resume_analysis = index.as_query_engine(similarity_top_k=5).query(
-        analysis_prompt
-    )
-
-    # Step 2: Generate optimization suggestions
-    optimization_prompt = f"""
-    基于简历分析和职位要求，提供具体、可操作的改进建议。
-    
-    简历分析：
-    {resume_analysis}
-    
-    职位名称：{job_title}
-    职位描述：{job_description}
-    
-    优化请求：{query_text}
-    
-    请严格按照以下格式提供直接、结构化的回应：
-
-    ## 主要发现
-    • [2-3个要点，突出主要匹配度和差距]
-
-    ## 具体改进
-    • [3-5个要点，提供具体建议]
-    • 每个要点应以强有力的动作动词开头
-    • 尽可能包含具体示例
-
-    ## 行动项目
-    • [2-3个具体的、立即可以执行的步骤]
-    • 每个项目应清晰明确且可实施
-
-    保持所有要点简洁且可操作。不要包含任何思考过程或分析。
-    """
-
-    optimization_suggestions = index.as_query_engine(similarity_top_k=5).query(
-        optimization_prompt
-    )
-
-    return str(optimization_suggestions)
-
-
-def display_pdf_preview(pdf_file):
+def display_pdf_preview(data: bytes):
     """Display PDF preview in the sidebar."""
     try:
         st.sidebar.subheader("Resume Preview")
-        base64_pdf = base64.b64encode(pdf_file.getvalue()).decode("utf-8")
-        pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="100%" height="500" type="application/pdf"></iframe>'
-        st.sidebar.markdown(pdf_display, unsafe_allow_html=True)
+        # 由 Streamlit 的媒体服务按 URL 提供文件，不再把整份 PDF 编码成 base64 内联到页面
+        st.sidebar.pdf(data, height=500)
         return True
     except Exception as e:
         st.sidebar.error(f"Error previewing PDF: {str(e)}")
         return False
 
 
+def format_timings(timings: dict) -> str:
+    """Render per-stage timings of a RAG run."""
+    labels = {"retrieve": "检索", "analysis": "分析", "suggestion": "建议"}
+    return " · ".join(
+        f"{label} {timings[k]:.2f}s" for k, label in labels.items() if k in timings
+    )
+
+
+def render_ats_report(report: dict):
+    """Display the local ATS keyword coverage report."""
+    st.metric("ATS 关键词覆盖率", f"{report['coverage']:.0%}")
+    with st.expander(f"缺失关键词（{len(report['missing'])}）"):
+        st.write("、".join(report["missing"]) or "无")
+        if report["semantic"]:
+            st.caption(
+                "语义相近："
+                + "、".join(
+                    f"{v['keyword']}（{v['similarity']:.2f}）" for v in report["semantic"]
+                )
+            )
+
+
+def cached_ats_report(embedding_model: str, job_description: str) -> dict | None:
+    """The memoized ATS report of the loaded resume and ``job_description``, if any."""
+    key = (st.session_state.get("resume_hash"), embedding_model, job_description)
+    cached = st.session_state.get("ats_report")
+    return cached[1] if cached is not None and cached[0] == key else None
+
+
+def score_ats(
+    job_description: str, embedding_model: str, generative_model: str
+) -> dict:
+    """Local ATS report of the loaded resume, memoized in the session by
+    (resume hash, embedding model, job description)."""
+    report = cached_ats_report(embedding_model, job_description)
+    if report is not None:
+        return report
+
+    index = rag.prepare_index(
+        st.session_state.documents,
+        embedding_model,
+        generative_model,
+        st.session_state.resume_hash,
+    )
+    report = ats.score(job_description, index, Settings.embed_model, embedding_model)
+    st.session_state.ats_report = (
+        (st.session_state.resume_hash, embedding_model, job_description),
+        report,
+    )
+    return report
+
+
+def optimization_query(optimization_type: str, ats_report: dict | None) -> str:
+    """The optimization request, with the local ATS report for the ATS type."""
+    query_text = rag.OPTIMIZATIONS[optimization_type]
+    if optimization_type == rag.ATS_OPTIMIZATION and ats_report:
+        query_text += "\n\n" + ats.format_report(ats_report)
+    return query_text
+
+
+async def render_all(
+    documents,
+    resume_hash: str,
+    job_title: str,
+    job_description: str,
+    embedding_model: str,
+    generative_model: str,
+    ats_report: dict | None = None,
+):
+    """Run every optimization type concurrently, filling one tab per type as
+    each finishes."""
+    with st.spinner("加载简历索引并分析中..."):
+        index = rag.prepare_index(
+            documents, embedding_model, generative_model, resume_hash
+        )
+        resume_analysis = await rag.aanalyze(index, resume_hash, generative_model)
+
+    with st.expander("简历分析", expanded=False):
+        st.markdown(resume_analysis)
+
+    names = list(rag.OPTIMIZATIONS)
+    slots = {}
+    for name, tab in zip(names, st.tabs(names)):
+        slots[name] = tab.empty()
+        slots[name].info("生成中...")
+
+    queries = {rag.ATS_OPTIMIZATION: optimization_query(rag.ATS_OPTIMIZATION, ats_report)}
+    async for name, out, elapsed in rag.optimize_all(
+        index, resume_analysis, job_title, job_description, queries=queries
+    ):
+        with slots[name].container():
+            if isinstance(out, Exception):
+                st.error(f"Error: {str(out)}")
+                continue
+            st.markdown(out)
+            st.caption(f"生成 {elapsed:.2f}s")
+        st.session_state.messages.append(
+            {"role": "assistant", "content": f"### {name}\n\n{out}"}
+        )
+
+
 def main():
     st.set_page_config(page_title="Resume Optimizer", layout="wide")
 
@@ -103,8 +134,6 @@ def main():
         st.session_state.messages = []
     if "docs_loaded" not in st.session_state:
         st.session_state.docs_loaded = False
-    if "temp_dir" not in st.session_state:
-        st.session_state.temp_dir = None
     if "current_pdf" not in st.session_state:
         st.session_state.current_pdf = None
 
@@ -142,96 +171,132 @@ def main():
                     #     st.error("Missing Nebius API key")
                     #     st.stop()
 
-                    # 创建存储 PDF 的临时目录
-                    if st.session_state.temp_dir:
-                        shutil.rmtree(st.session_state.temp_dir)
-                    st.session_state.temp_dir = tempfile.mkdtemp()
-
-                    # 将上传的 pdf 保存到临时目录
-                    file_path = os.path.join(
-                        st.session_state.temp_dir, uploaded_file.name
-                    )
-                    with open(file_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-
+                    data = uploaded_file.getvalue()
                     with st.spinner("简历加载中 ..."):
-                        documents = SimpleDirectoryReader(
-                            st.session_state.temp_dir
-                        ).load_data()
+                        # 直接从上传的内存数据解析，不落盘
+                        documents = pdf.load_pdf(data, uploaded_file.name)
                         st.session_state.docs_loaded = True
                         st.session_state.documents = documents
+                        st.session_state.resume_hash = index_cache.content_hash(
+                            documents
+                        )
                         st.success("✓ 简历加载成功")
-                        display_pdf_preview(uploaded_file)
+                        display_pdf_preview(data)
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
 
     # Main content area
     col1, col2 = st.columns([1, 1])
 
+    with col2:
+        st.subheader("优化结果")
+        for message in st.session_state.messages:
+            st.markdown(message["content"])
+            if "timings" in message:
+                st.caption(format_timings(message["timings"]))
+
     with col1:
         st.subheader("职位信息")
         job_title = st.text_input("职位名称")
         job_description = st.text_area("职位描述", height=200)
 
-        st.subheader("优化选项")
-        optimization_type = st.selectbox(
-            "选择优化类型",
-            [
-                # ATS 全称申请人跟踪系统（Applicant Tracking System）在筛选简历时重点关注的技能、经验或资格等核心词汇。
-                "ATS关键词优化器",
-                "经验部分增强",
-                "技能层次创建器",
-                "专业摘要撰写器",
-                "教育优化",
-                "技术技能展示",
-                "职业空档期润色",
-            ],
+        # 本地 ATS 关键词覆盖率在点击评分或优化时才计算，之后按简历和职位描述复用
+        ats_slot = st.empty()
+        ats_report = cached_ats_report(embedding_model, job_description)
+        if ats_report is not None:
+            with ats_slot.container():
+                render_ats_report(ats_report)
+        score_only = st.button(
+            "计算 ATS 覆盖率", help="只在本地计算关键词覆盖率，不调用大模型生成建议"
         )
 
-        if st.button("优化简历"):
+        st.subheader("优化选项")
+        optimization_type = st.selectbox("选择优化类型", list(rag.OPTIMIZATIONS))
+
+        optimize_one = st.button("优化简历")
+        optimize_all = st.button("全部优化", help="一次分析简历，并发生成所有类型的优化建议")
+        if score_only or optimize_one or optimize_all:
             if not st.session_state.docs_loaded:
                 st.error("请先上传你的简历")
                 st.stop()
-            if not job_title or not job_description:
+            if not job_description:
+                st.error("请提供职位描述")
+                st.stop()
+            # 只评分时不需要职位名称
+            if not job_title and not score_only:
                 st.error("请提供职位名称和职位描述")
                 st.stop()
 
-            # 优化类型对应的生成优化提示词
-            prompts = {
-                "ATS关键词优化器": "识别并优化ATS关键词。重点关注职位描述中的精确匹配和语义变体。",
-                "经验部分增强": "增强经验部分以符合职位要求。重点关注可量化的成就。",
-                "技能层次创建": "根据职位要求组织技能。识别差距和发展机会。",
-                "专业摘要撰写": "创建针对性的专业摘要，突出相关经验和技能。",
-                "教育优化": "优化教育部分，强调与该职位相关的资格。",
-                "技术技能展示": "根据职位要求组织技术技能。突出关键能力。",
-                "职业空档期润色": "专业地处理职业空档期。关注成长和相关经验。",
-            }
-
-            with st.spinner("分析简历并生成建议中..."):
+            if ats_report is None:
+                try:
+                    with st.spinner("计算 ATS 关键词覆盖率..."):
+                        ats_report = score_ats(
+                            job_description, embedding_model, generative_model
+                        )
+                    with ats_slot.container():
+                        render_ats_report(ats_report)
+                except Exception as e:
+                    ats_slot.warning(f"ATS 关键词覆盖率计算失败：{str(e)}")
+
+        if optimize_all:
+            with col2:
+                try:
+                    asyncio.run(
+                        render_all(
+                            st.session_state.documents,
+                            st.session_state.resume_hash,
+                            job_title,
+                            job_description,
+                            embedding_model,
+                            generative_model,
+                            ats_report,
+                        )
+                    )
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+
+            st.divider()
+
+        if optimize_one:
+            # 在结果列里流式展示生成过程
+            with col2:
+                timings = {}
                 try:
-                    response = run_rag_completion(
-                        st.session_state.documents,
-                        prompts[optimization_type],
-                        job_title,
-                        job_description,
-                        embedding_model,
-                        generative_model,
+                    with st.spinner("加载简历索引中..."):
+                        index = rag.prepare_index(
+                            st.session_state.documents,
+                            embedding_model,
+                            generative_model,
+                            st.session_state.resume_hash,
+                        )
+                    with st.expander("简历分析", expanded=False):
+                        resume_analysis = st.write_stream(
+                            rag.stream_analysis(
+                                index,
+                                timings,
+                                st.session_state.resume_hash,
+                                generative_model,
+                            )
+                        )
+                    response = st.write_stream(
+                        rag.stream_suggestions(
+                            index,
+                            resume_analysis,
+                            optimization_query(optimization_type, ats_report),
+                            job_title,
+                            job_description,
+                            timings,
+                        )
                     )
-                    # Remove think tags from response
-                    response = response.replace("<think>", "").replace("</think>", "")
+                    st.caption(format_timings(timings))
                     st.session_state.messages.append(
-                        {"role": "assistant", "content": response}
+                        {"role": "assistant", "content": response, "timings": timings}
                     )
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
 
             st.divider()
 
-    with col2:
-        st.subheader("优化结果")
-        for message in st.session_state.messages:
-            st.markdown(message["content"])
-
 
 if __name__ == "__main__":
     main()
@@ -16,12 +16,18 @@ def must_new_openai_like(model: str) -> OpenAILike:
     return llm
 
 
-def must_new_openai_like_embedding(model: str) -> OpenAILikeEmbedding:
-    """初始化 OpenAI-like LLM 模型"""
+def must_new_openai_like_embedding(
+    model: str, embed_batch_size: int = 10
+) -> OpenAILikeEmbedding:
+    """初始化 OpenAI-like 文本向量模型
+
+    embed_batch_size 是单次请求的分块数上限（DashScope 为 10），并发和限流由
+    embedding.EmbeddingPipeline 负责。
+    """
     embedding = OpenAILikeEmbedding(
         model_name=model,
         api_base=os.environ["OPENAI_API_BASE_URL"],
         api_key=os.environ["OPENAI_API_KEY"],
-        embed_batch_size=10,
+        embed_batch_size=embed_batch_size,
     )
     return embedding
@@ -0,0 +1,62 @@
+"""
+直接从内存中的 PDF 数据解析出文档，不经过临时目录落盘。
+
+页数很多的 PDF 才按页段分给多个进程并行提取文本。进程用 spawn 方式启动：Streamlit 服务
+是多线程的，fork 出的子进程可能继承被其他线程持有的锁。每个子进程都要重新导入模块、拷贝一份
+PDF 数据并解析文档结构，只有页数足够多、提取文本的耗时远大于这些开销时才值得；简历通常只有
+几页，总是在当前进程里提取。
+"""
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from llama_index.core.schema import Document
+from PyPDF2 import PdfReader
+
+# 页数达到该值才并行提取。spawn 子进程的启动和导入要一秒左右，页数少时得不偿失
+PARALLEL_MIN_PAGES = 64
+
+
+def extract_pages(data: bytes, start: int, stop: int) -> list[str]:
+    """Extract the text of pages ``[start, stop)`` of the PDF in ``data``."""
+    return page_texts(PdfReader(io.BytesIO(data)), start, stop)
+
+
+def page_texts(reader: PdfReader, start: int, stop: int) -> list[str]:
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def load_pdf(data: bytes, file_name: str, workers: int | None = None) -> list[Document]:
+    """Parse a PDF held in memory into one document per page.
+
+    Args:
+        data: Content of the PDF file.
+        file_name: Name recorded in the documents' metadata.
+        workers: Max processes for parallel extraction. Defaults to the CPU count.
+
+    Returns:
+        list[Document]: Pages with ``page_label`` and ``file_name`` metadata, as
+            produced by ``SimpleDirectoryReader``.
+    """
+    reader = PdfReader(io.BytesIO(data))
+    num_pages = len(reader.pages)
+
+    workers = min(workers or os.cpu_count() or 1, num_pages)
+    if num_pages < PARALLEL_MIN_PAGES or workers < 2:
+        # 复用已经解析好的文档，不再解析一遍
+        texts = page_texts(reader, 0, num_pages)
+    else:
+        step = -(-num_pages // workers)
+        ranges = [(i, min(i + step, num_pages)) for i in range(0, num_pages, step)]
+        with ProcessPoolExecutor(
+            max_workers=len(ranges), mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            parts = pool.map(extract_pages, *zip(*((data, a, b) for a, b in ranges)))
+            texts = [t for part in parts for t in part]
+
+    return [
+        Document(text=text, metadata={"page_label": str(i + 1), "file_name": file_name})
+        for i, text in enumerate(texts)
+    ]
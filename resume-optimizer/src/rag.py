@@ -0,0 +1,278 @@
+"""
+简历优化的 RAG 流程：先分析简历，再结合岗位要求生成优化建议。
+
+两个阶段都以流式方式生成，调用方可以边生成边展示；各阶段耗时记录在调用方传入
+的 ``timings`` 字典里（秒）：``retrieve`` 为两次检索的总耗时，``analysis`` 和
+``suggestion`` 分别为两次生成的耗时。
+
+第一阶段的简历分析与优化类型无关，按（简历哈希，大模型）缓存，所有优化类型共用。
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+
+from llama_index.core import Settings, VectorStoreIndex, get_response_synthesizer
+from llama_index.core.schema import Document
+
+import index_cache
+import model
+
+SIMILARITY_TOP_K = 5
+
+# “全部优化”时并发生成的上限
+MAX_CONCURRENCY = 4
+
+ATS_OPTIMIZATION = "ATS关键词优化器"
+
+# 优化类型对应的生成优化提示词
+# ATS 全称申请人跟踪系统（Applicant Tracking System）在筛选简历时重点关注的技能、经验或资格等核心词汇。
+OPTIMIZATIONS = {
+    "ATS关键词优化器": "识别并优化ATS关键词。重点关注职位描述中的精确匹配和语义变体。",
+    "经验部分增强": "增强经验部分以符合职位要求。重点关注可量化的成就。",
+    "技能层次创建器": "根据职位要求组织技能。识别差距和发展机会。",
+    "专业摘要撰写器": "创建针对性的专业摘要，突出相关经验和技能。",
+    "教育优化": "优化教育部分，强调与该职位相关的资格。",
+    "技术技能展示": "根据职位要求组织技术技能。突出关键能力。",
+    "职业空档期润色": "专业地处理职业空档期。关注成长和相关经验。",
+}
+
+ANALYSIS_PROMPT = """
+    详细分析这份简历。重点关注：
+    1. 关键技能和专业能力
+    2. 工作经验和成就
+    3. 教育背景和认证
+    4. 重要项目或成就
+    5. 职业发展轨迹和空缺期
+
+    请以要点形式提供简洁的分析。
+    """
+
+OPTIMIZATION_PROMPT = """
+    基于简历分析和职位要求，提供具体、可操作的改进建议。
+
+    简历分析：
+    {resume_analysis}
+
+    职位名称：{job_title}
+    职位描述：{job_description}
+
+    优化请求：{query_text}
+
+    请严格按照以下格式提供直接、结构化的回应：
+
+    ## 主要发现
+    • [2-3个要点，突出主要匹配度和差距]
+
+    ## 具体改进
+    • [3-5个要点，提供具体建议]
+    • 每个要点应以强有力的动作动词开头
+    • 尽可能包含具体示例
+
+    ## 行动项目
+    • [2-3个具体的、立即可以执行的步骤]
+    • 每个项目应清晰明确且可实施
+
+    保持所有要点简洁且可操作。不要包含任何思考过程或分析。
+    """
+
+THINK_TAGS = ("<think>", "</think>")
+
+# (简历哈希, 大模型) -> 简历分析
+_analyses: dict[tuple[str, str], str] = {}
+_analyses_lock = threading.Lock()
+
+
+def get_analysis(resume_hash: str, generative_model: str) -> str | None:
+    with _analyses_lock:
+        return _analyses.get((resume_hash, generative_model))
+
+
+def put_analysis(resume_hash: str, generative_model: str, analysis: str):
+    with _analyses_lock:
+        _analyses[(resume_hash, generative_model)] = analysis
+
+
+def strip_think_tags(tokens: Iterable[str]) -> Iterator[str]:
+    """Remove ``<think>`` tags from a token stream, including tags split across tokens.
+
+    A trailing fragment that could be the start of a tag is held back until the
+    next token tells whether it is one.
+    """
+    buf = ""
+    for token in tokens:
+        buf += token
+        for tag in THINK_TAGS:
+            buf = buf.replace(tag, "")
+
+        held = 0
+        for tag in THINK_TAGS:
+            for n in range(min(len(tag) - 1, len(buf)), 0, -1):
+                if buf.endswith(tag[:n]):
+                    held = max(held, n)
+                    break
+
+        if len(buf) > held:
+            yield buf[: len(buf) - held]
+            buf = buf[len(buf) - held :]
+    if buf:
+        yield buf
+
+
+def prepare_index(
+    documents: list[Document],
+    embedding_model: str,
+    generative_model: str,
+    resume_hash: str | None = None,
+) -> VectorStoreIndex:
+    """Configure the models and return the (cached) index of the resume."""
+    llm = model.must_new_openai_like(generative_model)
+    embed_model = model.must_new_openai_like_embedding(embedding_model)
+
+    Settings.llm = llm
+    Settings.embed_model = embed_model
+
+    # 同一份简历和向量模型只建一次索引，之后从缓存复用
+    return index_cache.get_default().get_or_build(
+        documents, embedding_model, embed_model, resume_hash
+    )
+
+
+def stream_query(
+    index: VectorStoreIndex, prompt: str, stage: str, timings: dict
+) -> Iterator[str]:
+    """Retrieve context for ``prompt`` and stream the generated answer."""
+    started = time.perf_counter()
+    nodes = index.as_retriever(similarity_top_k=SIMILARITY_TOP_K).retrieve(prompt)
+    timings["retrieve"] = timings.get("retrieve", 0.0) + time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = get_response_synthesizer(streaming=True).synthesize(prompt, nodes=nodes)
+    yield from strip_think_tags(response.response_gen)
+    timings[stage] = time.perf_counter() - started
+
+
+def stream_analysis(
+    index: VectorStoreIndex,
+    timings: dict,
+    resume_hash: str | None = None,
+    generative_model: str | None = None,
+) -> Iterator[str]:
+    """Step 1: stream the analysis of the resume.
+
+    When ``resume_hash`` and ``generative_model`` are given, a cached analysis
+    is replayed at once and a fresh one is cached after generation.
+    """
+    cacheable = resume_hash is not None and generative_model is not None
+    if cacheable:
+        analysis = get_analysis(resume_hash, generative_model)
+        if analysis is not None:
+            timings["analysis"] = 0.0
+            yield analysis
+            return
+
+    chunks = []
+    for chunk in stream_query(index, ANALYSIS_PROMPT, "analysis", timings):
+        chunks.append(chunk)
+        yield chunk
+    if cacheable:
+        put_analysis(resume_hash, generative_model, "".join(chunks))
+
+
+def optimization_prompt(
+    resume_analysis: str, query_text: str, job_title: str, job_description: str
+) -> str:
+    return OPTIMIZATION_PROMPT.format(
+        resume_analysis=resume_analysis,
+        job_title=job_title,
+        job_description=job_description,
+        query_text=query_text,
+    )
+
+
+def stream_suggestions(
+    index: VectorStoreIndex,
+    resume_analysis: str,
+    query_text: str,
+    job_title: str,
+    job_description: str,
+    timings: dict,
+) -> Iterator[str]:
+    """Step 2: stream optimization suggestions built on the resume analysis."""
+    prompt = optimization_prompt(resume_analysis, query_text, job_title, job_description)
+    return stream_query(index, prompt, "suggestion", timings)
+
+
+async def aquery(index: VectorStoreIndex, prompt: str) -> str:
+    """Retrieve context for ``prompt`` and generate the full answer asynchronously."""
+    nodes = await index.as_retriever(similarity_top_k=SIMILARITY_TOP_K).aretrieve(prompt)
+    response = await get_response_synthesizer().asynthesize(prompt, nodes=nodes)
+    return "".join(strip_think_tags([str(response)]))
+
+
+async def aanalyze(
+    index: VectorStoreIndex, resume_hash: str, generative_model: str
+) -> str:
+    """Step 1, asynchronously and through the analysis cache."""
+    analysis = get_analysis(resume_hash, generative_model)
+    if analysis is None:
+        analysis = await aquery(index, ANALYSIS_PROMPT)
+        put_analysis(resume_hash, generative_model, analysis)
+    return analysis
+
+
+async def optimize_all(
+    index: VectorStoreIndex,
+    resume_analysis: str,
+    job_title: str,
+    job_description: str,
+    concurrency: int = MAX_CONCURRENCY,
+    queries: dict[str, str] | None = None,
+) -> AsyncIterator[tuple[str, str | Exception, float]]:
+    """Step 2 for every optimization type at once, sharing one resume analysis.
+
+    ``queries`` overrides the optimization request of some types, e.g. to
+    include the local ATS report.
+
+    Yields:
+        tuple: ``(optimization type, suggestions or the raised error, seconds)``
+            in completion order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(name: str, query_text: str):
+        async with semaphore:
+            started = time.perf_counter()
+            prompt = optimization_prompt(
+                resume_analysis, query_text, job_title, job_description
+            )
+            try:
+                out = await aquery(index, prompt)
+            except Exception as e:
+                out = e
+            return name, out, time.perf_counter() - started
+
+    tasks = [run(k, v) for k, v in (OPTIMIZATIONS | (queries or {})).items()]
+    for done in asyncio.as_completed(tasks):
+        yield await done
+
+
+def run_rag_completion(
+    documents: list[Document],
+    query_text: str,
+    job_title: str,
+    job_description: str,
+    embedding_model: str,
+    generative_model: str,
+) -> str:
+    """Run RAG completion for resume optimization, returning the full suggestions."""
+    index = prepare_index(documents, embedding_model, generative_model)
+
+    timings = {}
+    resume_analysis = "".join(stream_analysis(index, timings))
+    return "".join(
+        stream_suggestions(
+            index, resume_analysis, query_text, job_title, job_description, timings
+        )
+    )
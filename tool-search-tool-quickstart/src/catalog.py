@@ -0,0 +1,229 @@
+"""
+MCP 工具目录的本地缓存。
+
+每个 MCP 服务器的工具名、描述和参数 schema 落盘为一个 JSON 文件，启动时直接读取，不必
+先连上服务器下载、转换全部工具；缓存过期后在后台重新拉取，内容哈希有变化才通知调用方更新。
+文件按服务器名加身份（地址和凭据的摘要）区分，换了服务器地址或令牌不会读到别处的工具列表。
+目录里只是轻量的 ``ToolSpec``，``load_tool`` 真正加载某个工具时才构造对应的 ``BaseTool``。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from mcp.types import CallToolResult, Tool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.path.join(".cache", "mcp-catalog")
+DEFAULT_MAX_AGE = 3600
+# 目录文件格式的版本，格式变化时旧文件视为未缓存
+VERSION = 1
+
+# (工具名, 参数) -> 调用结果，如绑定了服务器名的 SessionManager.call_tool
+Caller = Callable[[str, dict[str, Any]], Awaitable[CallToolResult]]
+
+
+def result_text(result: CallToolResult) -> str:
+    """Flatten the content of an MCP tool result, raising if the tool failed."""
+    parts = [
+        c.text if c.type == "text" else c.model_dump_json(exclude_none=True)
+        for c in result.content
+    ]
+    text = "\n".join(parts)
+    if result.isError:
+        raise ToolException(text)
+    return text
+
+
+@dataclass
+class ToolSpec:
+    """Name, description and input schema of an MCP tool, enough to search it."""
+
+    name: str
+    description: str
+    input_schema: dict[str, Any]
+    # 调用工具的方式，运行时才绑定，不落盘
+    call: Caller | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def args(self) -> dict:
+        return self.input_schema.get("properties", {})
+
+    @classmethod
+    def from_mcp(cls, tool: Tool) -> "ToolSpec":
+        return cls(tool.name, tool.description or "", tool.inputSchema)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "input_schema": self.input_schema,
+        }
+
+    def to_tool(self) -> BaseTool:
+        """Build the LangChain tool, which invokes the MCP tool through ``call``."""
+
+        async def run(**kwargs) -> str:
+            # 绕过 langgraph 缺陷时注入的 runtime 不是工具参数
+            kwargs.pop("runtime", None)
+            return result_text(await self.call(self.name, kwargs))
+
+        return StructuredTool(
+            name=self.name,
+            description=self.description,
+            args_schema=self.input_schema,
+            coroutine=run,
+        )
+
+
+def catalog_hash(specs: list[ToolSpec]) -> str:
+    data = json.dumps([v.to_dict() for v in specs], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class Catalog:
+    """Tool catalogs of MCP servers, persisted as one JSON file per server.
+
+    Args:
+        root: Directory holding the catalog files.
+        max_age: Catalogs older than this many seconds are refreshed in the
+            background.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, max_age: float = DEFAULT_MAX_AGE):
+        self.root = root
+        self.max_age = max_age
+        # 目录文件路径 -> 进行中的刷新
+        self.refreshing: dict[str, asyncio.Task] = {}
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, server: str, identity: str = "") -> str:
+        if not identity:
+            return os.path.join(self.root, f"{server}.json")
+        digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.root, f"{server}-{digest}.json")
+
+    def read(self, server: str, identity: str = "") -> dict | None:
+        try:
+            with open(self.path(server, identity), encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable catalog of {server}: {e!r}")
+            return None
+        if entry.get("version") != VERSION or entry.get("identity", "") != identity:
+            return None
+        return entry
+
+    def write(self, server: str, specs: list[ToolSpec], identity: str = "") -> dict:
+        entry = {
+            "version": VERSION,
+            "server": server,
+            "identity": identity,
+            "fetched_at": time.time(),
+            "hash": catalog_hash(specs),
+            "tools": [v.to_dict() for v in specs],
+        }
+        # 先写临时文件再改名，避免进程中途退出留下半个文件
+        path = self.path(server, identity)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+        return entry
+
+    async def get(
+        self,
+        server: str,
+        fetch: Callable[[], Awaitable[list[Tool]]],
+        call: Caller | None = None,
+        identity: str = "",
+    ) -> list[ToolSpec]:
+        """Return the tools of ``server`` from disk, fetching them only on a miss.
+
+        Args:
+            server: Name of the MCP server.
+            fetch: Lists the tools of the server.
+            call: Invokes tools of the server, attached to the returned specs.
+            identity: What the tool list depends on besides the name, such as
+                the server URL and a digest of the credential; see
+                ``github_mcp.identity``.
+        """
+        started = time.perf_counter()
+        entry = self.read(server, identity)
+        if entry is None:
+            specs = [ToolSpec.from_mcp(v) for v in await fetch()]
+            self.write(server, specs, identity)
+            source = "server"
+        else:
+            specs = [ToolSpec(**v) for v in entry["tools"]]
+            source = "catalog"
+
+        for v in specs:
+            v.call = call
+        logger.info(
+            f"Loaded {len(specs)} tools of {server} from {source} "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        return specs
+
+    def refresh(
+        self,
+        server: str,
+        fetch: Callable[[], Awaitable[list[Tool]]],
+        call: Caller | None = None,
+        on_change: Callable[[list[ToolSpec]], Awaitable[None]] | None = None,
+        identity: str = "",
+    ) -> asyncio.Task | None:
+        """Re-fetch the tools of ``server`` in the background if its catalog is
+        stale, calling ``on_change`` with them when the catalog changed.
+
+        Returns:
+            asyncio.Task | None: The refresh, or none if the catalog is fresh.
+        """
+        entry = self.read(server, identity)
+        if entry and time.time() - entry["fetched_at"] <= self.max_age:
+            return None
+        key = self.path(server, identity)
+        if key in self.refreshing and not self.refreshing[key].done():
+            return self.refreshing[key]
+
+        async def run():
+            try:
+                specs = [ToolSpec.from_mcp(v) for v in await fetch()]
+            except Exception as e:
+                logger.warning(f"Failed to refresh the catalog of {server}: {e!r}")
+                return
+
+            new = self.write(server, specs, identity)
+            if entry and new["hash"] == entry["hash"]:
+                logger.info(f"Catalog of {server} is up to date")
+                return
+
+            logger.info(f"Catalog of {server} changed, {len(specs)} tools")
+            for v in specs:
+                v.call = call
+            if on_change is not None:
+                await on_change(specs)
+
+        self.refreshing[key] = asyncio.create_task(run())
+        return self.refreshing[key]
+
+
+_default: Catalog | None = None
+
+
+def get_default() -> Catalog:
+    """Return the process-wide catalog rooted at ``MCP_CATALOG_DIR``."""
+    global _default
+
+    if _default is None:
+        _default = Catalog(os.environ.get("MCP_CATALOG_DIR", DEFAULT_ROOT))
+    return _default
@@ -0,0 +1,99 @@
+"""
+调用模型前压缩会话历史，使提示词不超过令牌预算。
+
+只压缩发给模型的副本，``MessagesState`` 里仍保留完整的工具结果，模型可以通过
+``get_tool_result`` 按 tool_call_id 取回原文。压缩依次执行：
+
+1. 之后已经加载过工具的 ``search_tools`` 结果只留一行说明（说明比原文短时）；
+2. 超出预算时，从最早的工具结果开始截断到固定长度，最近几轮的结果保持原样；
+3. 仍超出预算时，从最早的工具结果开始只留一行说明，直到满足预算。
+"""
+
+from langchain.messages import AIMessage, AnyMessage, ToolMessage
+
+# 粗略估算：平均每个令牌约 4 个字符
+CHARS_PER_TOKEN = 4
+CONTEXT_BUDGET = 32000
+# 最近的几轮工具调用结果保持原样
+KEEP_TURNS = 1
+# 较早的工具结果截断后保留的字符数
+TRUNCATE_CHARS = 2000
+
+
+def text_of(m: AnyMessage) -> str:
+    return m.content if isinstance(m.content, str) else str(m.content)
+
+
+def estimate_tokens(messages: list[AnyMessage]) -> int:
+    chars = 0
+    for m in messages:
+        chars += len(text_of(m))
+        if isinstance(m, AIMessage):
+            chars += sum(len(str(v["args"])) + len(v["name"]) for v in m.tool_calls)
+    return chars // CHARS_PER_TOKEN
+
+
+def stub(m: ToolMessage, reason: str) -> str:
+    return (
+        f"[{reason}; {len(text_of(m))} chars omitted, "
+        f"call get_tool_result with tool_call_id={m.tool_call_id!r} for the full text]"
+    )
+
+
+def compact(
+    messages: list[AnyMessage],
+    budget: int = CONTEXT_BUDGET,
+    keep_turns: int = KEEP_TURNS,
+    truncate_chars: int = TRUNCATE_CHARS,
+) -> list[AnyMessage]:
+    """Return ``messages`` with old tool results shortened to fit in ``budget``
+    tokens; the input list and its messages are left untouched."""
+    out = list(messages)
+
+    # 最近 keep_turns 轮工具调用之前的消息才可以压缩
+    turns = [i for i, m in enumerate(out) if isinstance(m, AIMessage) and m.tool_calls]
+    boundary = turns[-keep_turns] if len(turns) >= keep_turns > 0 else len(out)
+    old = [i for i in range(boundary) if isinstance(out[i], ToolMessage)]
+
+    def replace(i: int, content: str):
+        out[i] = out[i].model_copy(update={"content": content})
+
+    tokens = estimate_tokens(out)
+
+    def shorten(i: int, content: str):
+        """Replace the content of ``out[i]`` only if that makes it shorter."""
+        nonlocal tokens
+        saved = len(text_of(out[i])) - len(content)
+        if saved > 0:
+            tokens -= saved // CHARS_PER_TOKEN
+            replace(i, content)
+
+    # 之后加载过工具的检索结果已经用不上了
+    loaded_after = False
+    for i in reversed(range(len(out))):
+        m = out[i]
+        if isinstance(m, ToolMessage) and m.name == "load_tool" and m.status != "error":
+            loaded_after = True
+        elif isinstance(m, ToolMessage) and m.name == "search_tools" and loaded_after:
+            shorten(i, stub(m, "search results superseded by a later load_tool"))
+
+    # 超出预算时先从最早的工具结果开始截断，仍超出再只留一行说明
+    for i in old:
+        if tokens <= budget:
+            break
+        text = text_of(out[i])
+        if len(text) > truncate_chars:
+            shorten(i, text[:truncate_chars] + "\n" + stub(messages[i], "truncated"))
+    for i in old:
+        if tokens <= budget:
+            break
+        shorten(i, stub(messages[i], "old tool result"))
+
+    return out
+
+
+def find_tool_result(messages: list[AnyMessage], tool_call_id: str) -> ToolMessage | None:
+    for m in reversed(messages):
+        if isinstance(m, ToolMessage) and m.tool_call_id == tool_call_id:
+            return m
+    return None
@@ -0,0 +1,152 @@
+"""
+本地的 GitHub MCP 替身服务器，以及长连接会话与每次调用新建会话的对比测试。
+
+替身服务器基于 FastMCP，提供几个与 GitHub MCP 同名的只读和写入工具，可以模拟服务端
+延迟和错误率，不需要 GitHub 凭据也不走外网。
+
+    uv run src/fakemcp.py serve --port 8765 --latency 0.05
+    uv run src/fakemcp.py bench --url http://127.0.0.1:8765/mcp --calls 200 --concurrency 8
+
+让智能体连接替身服务器：在 .env 中设置 ``GITHUB_MCP_URL=http://127.0.0.1:8765/mcp``。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import time
+
+from mcp.server.fastmcp import FastMCP
+
+import sessions
+
+
+def new_server(host: str, port: int, latency: float = 0.0, error_rate: float = 0.0) -> FastMCP:
+    """Build the stand-in server; each tool call sleeps ``latency`` seconds and
+    fails with probability ``error_rate``."""
+    mcp = FastMCP("fake-github", host=host, port=port)
+    issues: dict[tuple[str, str], dict[int, dict]] = {}
+
+    async def simulate():
+        if latency:
+            await asyncio.sleep(random.uniform(latency / 2, latency * 1.5))
+        if random.random() < error_rate:
+            raise RuntimeError("injected failure")
+
+    def repo_issues(owner: str, repo: str) -> dict[int, dict]:
+        key = (owner, repo)
+        if key not in issues:
+            issues[key] = {
+                i: {
+                    "number": i,
+                    "title": f"Issue {i} of {owner}/{repo}",
+                    "state": "open",
+                    "body": f"Synthetic issue {i}.",
+                }
+                for i in range(1, 21)
+            }
+        return issues[key]
+
+    @mcp.tool()
+    async def issue_read(owner: str, repo: str, issue_number: int) -> str:
+        """Get information about a specific issue in a GitHub repository."""
+        await simulate()
+        return json.dumps(repo_issues(owner, repo).get(issue_number, {}))
+
+    @mcp.tool()
+    async def list_issues(owner: str, repo: str, state: str = "open") -> str:
+        """List issues in a GitHub repository."""
+        await simulate()
+        return json.dumps([v for v in repo_issues(owner, repo).values() if v["state"] == state])
+
+    @mcp.tool()
+    async def search_issues(query: str, owner: str = "", repo: str = "") -> str:
+        """Search for issues in GitHub repositories using issues search syntax."""
+        await simulate()
+        items = [
+            v for v in repo_issues(owner, repo).values() if query.lower() in json.dumps(v).lower()
+        ]
+        return json.dumps({"total_count": len(items), "items": items})
+
+    @mcp.tool()
+    async def issue_write(owner: str, repo: str, title: str, body: str = "") -> str:
+        """Create a new issue in a GitHub repository."""
+        await simulate()
+        items = repo_issues(owner, repo)
+        number = max(items, default=0) + 1
+        items[number] = {"number": number, "title": title, "state": "open", "body": body}
+        return json.dumps(items[number])
+
+    return mcp
+
+
+async def bench(url: str, calls: int, concurrency: int) -> list[dict]:
+    """Time ``calls`` tool calls over a new session each against one long-lived session."""
+    semaphore = asyncio.Semaphore(concurrency)
+    args = {"owner": "octo", "repo": "demo", "issue_number": 1}
+
+    async def run(name: str, call) -> dict:
+        async def one() -> float:
+            async with semaphore:
+                started = time.perf_counter()
+                await call()
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(one() for _ in range(calls)))
+        elapsed = time.perf_counter() - started
+        q = statistics.quantiles(latencies, n=100)
+        return {
+            "mode": name,
+            "calls": calls,
+            "wall_s": round(elapsed, 3),
+            "p50_ms": round(q[49] * 1000, 1),
+            "p95_ms": round(q[94] * 1000, 1),
+        }
+
+    async def per_call():
+        async with sessions.streamable_http(url) as session:
+            await session.call_tool("issue_read", args)
+
+    manager = sessions.SessionManager()
+    manager.add("fake", lambda: sessions.streamable_http(url))
+    try:
+        out = [
+            await run("session-per-call", per_call),
+            await run("pooled", lambda: manager.call_tool("fake", "issue_read", args)),
+        ]
+        out[-1]["sessions"] = manager.metrics()["fake"]
+    finally:
+        await manager.aclose()
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地的 GitHub MCP 替身服务器")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="启动替身服务器")
+    serve.add_argument("--host", default="127.0.0.1", help="监听地址")
+    serve.add_argument("--port", type=int, default=8765, help="监听端口，默认 8765")
+    serve.add_argument("--latency", type=float, default=0.0, help="工具调用的平均延迟（秒）")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="工具调用失败的概率")
+
+    b = sub.add_parser("bench", help="对比长连接会话与每次调用新建会话")
+    b.add_argument("--url", default="http://127.0.0.1:8765/mcp", help="MCP 服务器地址")
+    b.add_argument("--calls", type=int, default=200, help="调用次数，默认 200")
+    b.add_argument("--concurrency", type=int, default=8, help="并发数，默认 8")
+
+    args = parser.parse_args()
+
+    FORMAT = "%(asctime)s - %(filename)s(%(lineno)d) - %(levelname)s: %(message)s"
+    logging.basicConfig(format=FORMAT, datefmt="%Y-%m-%d %H:%M:%S", level=logging.INFO)
+
+    if args.command == "serve":
+        new_server(args.host, args.port, args.latency, args.error_rate).run(
+            transport="streamable-http"
+        )
+    else:
+        for r in asyncio.run(bench(args.url, args.calls, args.concurrency)):
+            print(json.dumps(r))
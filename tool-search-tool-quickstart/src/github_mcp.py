@@ -8,15 +8,20 @@
 """
 
 import asyncio
+import hashlib
 import os
+from contextlib import AbstractAsyncContextManager
 
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
+
+import sessions
+
+DEFAULT_URL = "https://api.githubcopilot.com/mcp/"
 
 
 def new_client(
-    url: str = "https://api.githubcopilot.com/mcp/",
+    url: str = DEFAULT_URL,
     pat: str | None = None,
 ) -> MultiServerMCPClient:
     if not pat:
@@ -42,33 +47,43 @@ def new_client(
     return out
 
 
-async def get_tools(
-    url: str = "https://api.githubcopilot.com/mcp/",
-    pat: str | None = None,
-):
+def auth_headers(url: str = DEFAULT_URL, pat: str | None = None) -> dict[str, str]:
+    """访问 url 的认证请求头。只有 GitHub 官方的服务器必须提供令牌，本地替身服务器等可以不带"""
     if not pat:
         pat = os.environ.get("GITHUB_PERSONAL_ACCESS_TOKEN")
-    if not pat:
+    if pat:
+        return {"Authorization": f"Bearer {pat}"}
+    if url == DEFAULT_URL:
         raise ValueError(
             "GitHub Personal Access Token not provided and "
             "GITHUB_PERSONAL_ACCESS_TOKEN environment variable not set."
         )
+    return {}
 
-    headers = {"Authorization": f"Bearer {pat}"}
-
-    # # Connect to a streamable HTTP server
-    async with streamablehttp_client(url, headers=headers) as (
-        read_stream,
-        write_stream,
-        _,
-    ):
-        # Create a session using the client streams
-        async with ClientSession(read_stream, write_stream) as session:
-            # Initialize the connection
-            await session.initialize()
-            # List available tools
-            tools = await session.list_tools()
-            return tools.tools
+
+def connect(
+    url: str = DEFAULT_URL,
+    pat: str | None = None,
+) -> AbstractAsyncContextManager[ClientSession]:
+    """打开一条初始化好的会话，可作为 sessions.SessionManager 的连接方式"""
+    return sessions.streamable_http(url, headers=auth_headers(url, pat))
+
+
+def identity(url: str = DEFAULT_URL, pat: str | None = None) -> str:
+    """服务器地址加令牌摘要，标识工具列表和调用结果来自哪个服务器、哪个身份"""
+    pat = pat or os.environ.get("GITHUB_PERSONAL_ACCESS_TOKEN") or ""
+    digest = hashlib.sha256(pat.encode("utf-8")).hexdigest()[:16] if pat else "anonymous"
+    return f"{url}#{digest}"
+
+
+async def get_tools(
+    url: str = DEFAULT_URL,
+    pat: str | None = None,
+):
+    async with connect(url, pat) as session:
+        # List available tools
+        tools = await session.list_tools()
+        return tools.tools
 
 
 if __name__ == "__main__":
@@ -1,58 +1,229 @@
 import asyncio
 import formatter
+import functools
 import logging
 import os
+import time
 
 from langchain.chat_models import BaseChatModel
 from langchain.messages import HumanMessage, SystemMessage, ToolMessage
 from langchain.tools import BaseTool, ToolRuntime, tool
+from langchain_core.runnables import Runnable
 from langchain_core.runnables.config import RunnableConfig
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langgraph.graph import END, START, MessagesState, StateGraph
 from langgraph.runtime import Runtime
-from rank_bm25 import BM25Okapi
 from typing_extensions import Literal
 
+import catalog
+import compaction
 import github_mcp
+import result_cache
+import search
+import semantic
+import sessions
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SERVER = "github"
+TOOL_CONCURRENCY = 4
+TOOL_TIMEOUT = 60.0
+# 会修改工具集的工具，同一轮里先于其他工具按顺序执行
+MUTATING_TOOLS = {"load_tool"}
+# 混合检索时两路各取的候选数，融合后再截取前 n 个
+CANDIDATES = 50
+
+
+def hydrate(t: BaseTool | catalog.ToolSpec) -> BaseTool:
+    """目录里的工具在加载时才构造成 BaseTool"""
+    return t.to_tool() if isinstance(t, catalog.ToolSpec) else t
+
+
+def embedding_text(t: BaseTool | catalog.ToolSpec) -> str:
+    """工具名、描述和参数名拼成的待向量化文本"""
+    return f"{t.name.replace('_', ' ')}\n{t.description}\nParameters: {', '.join(t.args)}"
+
 
 class Toolkit:
-    """工具集"""
+    """工具集
 
-    def __init__(self, tools: list[BaseTool], preloaded: list[BaseTool] | None = None):
-        self.tools = dict([(t.name, t) for t in tools])
-        self.descriptions = [f"{t.name} {t.description}" for t in tools]
+    工具按所属的 MCP 服务器划分命名空间，运行过程中可以增删、更新单个工具或者整个服务器的
+    工具，检索索引随之增量更新。工具名在所有服务器间唯一，重名时后添加的覆盖先添加的。
+    工具可以是目录里的 ToolSpec，加载时才构造成 BaseTool。
+    """
 
+    def __init__(
+        self,
+        tools: list[BaseTool | catalog.ToolSpec],
+        preloaded: list[BaseTool] | None = None,
+        server: str = DEFAULT_SERVER,
+        results: result_cache.ResultCache | None = None,
+    ):
+        self.tools: dict[str, BaseTool | catalog.ToolSpec] = {}
+        self.descriptions: dict[str, str] = {}
+        # 服务器 -> 工具名，以及工具名 -> 服务器
+        self.servers: dict[str, set[str]] = {}
+        self.owners: dict[str, str] = {}
+
+        # 按加载顺序去重的已加载工具
         self.loaded = dict([(t.name, t) for t in preloaded]) if preloaded else dict()
-        self.loaded_list = preloaded or []
+        # 已加载工具每变化一次版本号加一，绑定工具的模型按版本号缓存
+        self.version = 0
+        # 工具名 -> 转换好的 schema，已加载工具增减时只转换新加载的
+        self.schemas: dict[str, dict] = {}
+        self.bound: tuple[tuple[int, int], Runnable] | None = None
 
-        # Re-build index
-        tokenized_corpus = [desc.lower().split(" ") for desc in self.descriptions]
-        self.bm25 = BM25Okapi(tokenized_corpus)
+        self.index = search.SearchIndex()
+        self.semantic: semantic.SemanticIndex | None = None
+        self._index(tools, server)
 
-    def get(self, name: str) -> BaseTool:
-        return self.loaded[name]
+        # MCP 工具调用结果的缓存，预加载的本地工具不经过它
+        self.results = results
 
-    def load(self, name: str):
-        self.loaded[name] = self.tools[name]
-        self.loaded_list.append(self.tools[name])
+    @property
+    def loaded_list(self) -> list[BaseTool]:
+        return list(self.loaded.values())
+
+    def get(self, name: str) -> BaseTool | result_cache.CachedTool:
+        t = self.loaded[name]
+        if self.results is not None and name in self.tools:
+            return result_cache.CachedTool(t, self.results)
+        return t
 
-    def search(self, query: str, n: int = 3) -> list[str]:
+    def load(self, name: str):
+        if name not in self.loaded:
+            self.loaded[name] = hydrate(self.tools[name])
+            self.version += 1
+
+    def bind(self, model: BaseChatModel) -> tuple[Runnable, bool]:
+        """绑定了已加载工具的模型，已加载工具没有变化时复用上次的结果
+
+        Returns:
+            绑定后的模型，以及是否命中缓存
+        """
+        key = (id(model), self.version)
+        if self.bound is not None and self.bound[0] == key:
+            return self.bound[1], True
+
+        for name, t in self.loaded.items():
+            if name not in self.schemas:
+                self.schemas[name] = convert_to_openai_tool(t)
+        bound = model.bind_tools([self.schemas[name] for name in self.loaded])
+        self.bound = (key, bound)
+        return bound, False
+
+    def _index(
+        self, tools: list[BaseTool | catalog.ToolSpec], server: str
+    ) -> list[BaseTool | catalog.ToolSpec]:
+        """更新工具及其 BM25 索引，返回描述有变化的工具"""
+        changed = []
+        for t in tools:
+            if self.owners.get(t.name, server) != server:
+                self._disown(t.name)
+            self.servers.setdefault(server, set()).add(t.name)
+            self.owners[t.name] = server
+
+            self.tools[t.name] = t
+            if t.name in self.loaded:
+                self.loaded[t.name] = hydrate(t)
+                self.schemas.pop(t.name, None)
+                self.version += 1
+
+            desc = f"{t.name} {t.description}"
+            if self.descriptions.get(t.name) != desc:
+                self.descriptions[t.name] = desc
+                self.index.add(t.name, desc)
+                changed.append(t)
+        return changed
+
+    def _disown(self, name: str):
+        server = self.owners.pop(name)
+        self.servers[server].discard(name)
+        if not self.servers[server]:
+            del self.servers[server]
+
+    async def add(self, tools: list[BaseTool | catalog.ToolSpec], server: str = DEFAULT_SERVER):
+        """添加或更新 server 下的工具，只重新索引描述有变化的工具"""
+        changed = self._index(tools, server)
+        if self.semantic is not None and changed:
+            await self.semantic.add({t.name: embedding_text(t) for t in changed})
+
+    def remove(self, names: list[str]):
+        """删除工具，已加载的同时卸载"""
+        for name in names:
+            if name not in self.tools:
+                continue
+            del self.tools[name]
+            del self.descriptions[name]
+            self._disown(name)
+            if self.loaded.pop(name, None) is not None:
+                self.schemas.pop(name, None)
+                self.version += 1
+
+            self.index.remove(name)
+            if self.semantic is not None:
+                self.semantic.remove(name)
+
+    async def set_server(self, server: str, tools: list[BaseTool | catalog.ToolSpec]):
+        """以 tools 替换 server 下的全部工具"""
+        names = {t.name for t in tools}
+        self.remove([v for v in self.servers.get(server, ()) if v not in names])
+        await self.add(tools, server)
+
+    def remove_server(self, server: str):
+        self.remove(list(self.servers.get(server, ())))
+
+    async def enable_semantic(self, index: semantic.SemanticIndex):
+        """开启向量检索，之后的搜索结果融合 BM25 和向量相似度"""
+        docs = {name: embedding_text(t) for name, t in self.tools.items()}
+        await index.add(docs)
+        self.semantic = index
+
+        # 向量化期间工具集可能被后台刷新改过，补上这段时间的增删
+        for name in [v for v in index.rows if v not in self.tools]:
+            index.remove(name)
+        await index.add(
+            {
+                name: text
+                for name, t in self.tools.items()
+                if docs.get(name) != (text := embedding_text(t))
+            }
+        )
+
+    async def search(self, query: str, n: int = 3) -> list[str]:
         """根据名称获取功能可能满足要求的工具描述"""
 
-        tokenized_query = query.lower().split(" ")
-        top_docs = self.bm25.get_top_n(tokenized_query, self.descriptions, n=n)
+        if self.semantic is None:
+            ranked = [name for name, _ in self.index.search(query, n=n)]
+        else:
+            lexical = [name for name, _ in self.index.search(query, n=CANDIDATES)]
+            dense = [name for name, _ in await self.semantic.search(query, n=CANDIDATES)]
+            ranked = semantic.rrf([lexical, dense], n)
+
+        # 检索期间被删除的工具不再返回
+        top_docs = [self.descriptions[name] for name in ranked if name in self.descriptions]
 
         out = [doc.split("\n")[0][:120] for doc in top_docs]
         return out
 
 
 class Context:
-    def __init__(self, toolkit: Toolkit, model: BaseChatModel):
+    def __init__(
+        self,
+        toolkit: Toolkit,
+        model: BaseChatModel,
+        tool_concurrency: int = TOOL_CONCURRENCY,
+        tool_timeout: float = TOOL_TIMEOUT,
+        context_budget: int = compaction.CONTEXT_BUDGET,
+    ):
         self.toolkit = toolkit
         self.model = model
+        # 同一轮里并发执行的工具调用上限，以及单个工具调用的超时秒数
+        self.tool_concurrency = tool_concurrency
+        self.tool_timeout = tool_timeout
+        # 每轮发给模型的会话历史的令牌预算
+        self.context_budget = context_budget
 
 
 @tool
@@ -64,7 +235,7 @@ async def search_tools(query: str, runtime: ToolRuntime[Context]) -> list[str]:
     """
     logger.info(f"[Agent Action] Searching for: '{query}'")
 
-    return runtime.context.toolkit.search(query, n=5)
+    return await runtime.context.toolkit.search(query, n=5)
 
 
 @tool
@@ -80,47 +251,108 @@ async def load_tool(name: str, runtime: ToolRuntime[Context]) -> str:
     return f"Tool '{name}' is now loaded and ready to use."
 
 
+@tool
+async def get_tool_result(
+    tool_call_id: str, runtime: ToolRuntime[Context], offset: int = 0, limit: int = 8000
+) -> str:
+    """Returns the full text of an earlier tool result that was shortened in the conversation.
+
+    Args:
+        tool_call_id: The tool_call_id mentioned in the shortened result.
+        offset: Character offset to start from.
+        limit: Max number of characters to return.
+    """
+    logger.info(f"[Agent Action] Getting tool result: '{tool_call_id}'")
+    m = compaction.find_tool_result(runtime.state["messages"], tool_call_id)
+    if m is None:
+        return f"No tool result with tool_call_id={tool_call_id!r}."
+
+    text = compaction.text_of(m)
+    out = text[offset : offset + limit]
+    if offset + limit < len(text):
+        out += f"\n[{len(text) - offset - limit} more chars, continue with offset={offset + limit}]"
+    return out
+
+
 async def llm(state: MessagesState, runtime: Runtime[Context]):
     """LLM decides whether to call a tool or not"""
 
-    tools = runtime.context.toolkit.loaded_list
+    kit = runtime.context.toolkit
 
-    messages = state["messages"]
-    model = runtime.context.model.bind_tools(tools)
+    # 只压缩发给模型的副本，完整的工具结果仍留在状态里
+    messages = compaction.compact(state["messages"], budget=runtime.context.context_budget)
+    started = time.perf_counter()
+    model, cached = kit.bind(runtime.context.model)
+    bound = time.perf_counter()
 
     out = await model.ainvoke(messages)
+    logger.info(
+        f"[Turn] bind {bound - started:.4f}s ({len(kit.loaded)} tools, "
+        f"{'cached' if cached else f'version {kit.version}'}), "
+        f"model {time.perf_counter() - bound:.3f}s, "
+        f"~{compaction.estimate_tokens(messages)}/{compaction.estimate_tokens(state['messages'])} tokens"
+    )
 
     return {"messages": out}
 
 
-async def toolkit(
-    state: MessagesState, config: RunnableConfig, runtime: Runtime[Context]
-):
-    """Calls the requested tool and returns the result."""
-
-    messages = []
-
-    kit = runtime.context.toolkit
+async def call_tool(
+    state: MessagesState, config: RunnableConfig, runtime: Runtime[Context], v: dict
+) -> ToolMessage:
+    """调用单个工具，超时和异常都转成错误消息返回给模型，不影响同一轮的其他调用"""
 
+    # 每个调用各自一份 ToolRuntime，并发时 tool_call_id 才不会串
     tool_ctx = ToolRuntime(
         state=state,
         context=runtime.context,
         config=config,
         stream_writer=runtime.stream_writer,
         store=runtime.store,
-        tool_call_id=None,
+        tool_call_id=v["id"],
     )
+    # 这个操作绕过 langgraph v1.0.5 的缺陷。
+    # 详情参见 https://github.com/langchain-ai/langgraph/issues/6318
+    args = v["args"] | {"runtime": tool_ctx}
+
+    name = v["name"]
+    timeout = runtime.context.tool_timeout
+    try:
+        o = await asyncio.wait_for(runtime.context.toolkit.get(name).ainvoke(args), timeout)
+    except TimeoutError:
+        logger.warning(f"Tool '{name}' timed out after {timeout}s")
+        o, status = f"Error: tool '{name}' timed out after {timeout}s", "error"
+    except Exception as e:
+        logger.warning(f"Tool '{name}' failed: {e!r}")
+        o, status = f"Error: {e!r}", "error"
+    else:
+        status = "success"
+
+    return ToolMessage(content=o, tool_call_id=v["id"], name=name, status=status)
+
+
+async def toolkit(
+    state: MessagesState, config: RunnableConfig, runtime: Runtime[Context]
+):
+    """Calls the requested tools and returns the results in call order."""
+
     # https://reference.langchain.com/python/langchain/messages/#langchain.messages.ToolCall
-    for v in state["messages"][-1].tool_calls:
-        name = v["name"]
-        tool_ctx.tool_call_id = v["id"]
+    calls = state["messages"][-1].tool_calls
+    messages: list[ToolMessage | None] = [None] * len(calls)
+    started = time.perf_counter()
+
+    # 其余调用可能依赖本轮加载的工具，所以先按顺序执行会修改工具集的调用
+    for i, v in enumerate(calls):
+        if v["name"] in MUTATING_TOOLS:
+            messages[i] = await call_tool(state, config, runtime, v)
+
+    semaphore = asyncio.Semaphore(runtime.context.tool_concurrency)
 
-        # 这个操作绕过 langgraph v1.0.5 的缺陷。
-        # 详情参见 https://github.com/langchain-ai/langgraph/issues/6318
-        args = v["args"] | {"runtime": tool_ctx}
+    async def run(i: int, v: dict):
+        async with semaphore:
+            messages[i] = await call_tool(state, config, runtime, v)
 
-        o = await kit.get(name).ainvoke(args)
-        messages.append(ToolMessage(content=o, tool_call_id=v["id"]))
+    await asyncio.gather(*(run(i, v) for i, v in enumerate(calls) if messages[i] is None))
+    logger.info(f"[Tools] {len(calls)} calls in {time.perf_counter() - started:.3f}s")
 
     return {"messages": messages}
 
@@ -171,10 +403,55 @@ async def main():
 
     query = "Get details for issue https://github.com/SaschaHeyer/gen-ai-livestream/issues/6"
 
+    # 与 GitHub MCP 服务器保持一条长连接，列出工具和调用工具都复用它
+    manager = sessions.SessionManager()
+    url = os.environ.get("GITHUB_MCP_URL", github_mcp.DEFAULT_URL)
+    # 缺少令牌时在这里直接报错，而不是在后台重连里反复重试到超时
+    headers = github_mcp.auth_headers(url)
+    manager.add(DEFAULT_SERVER, lambda: sessions.streamable_http(url, headers))
+    fetch = functools.partial(manager.list_tools, DEFAULT_SERVER)
+    call = functools.partial(manager.call_tool, DEFAULT_SERVER)
+    # 换了服务器地址或令牌时不复用之前缓存的工具列表和调用结果
+    server_identity = github_mcp.identity(url)
+
+    # 工具目录优先读本地缓存，过期了再在后台刷新
+    tool_catalog = catalog.get_default()
     kit = Toolkit(
-        await github_mcp.new_client().get_tools(), preloaded=[search_tools, load_tool]
+        await tool_catalog.get(DEFAULT_SERVER, fetch, call, server_identity),
+        preloaded=[search_tools, load_tool, get_tool_result],
+        results=result_cache.ResultCache(
+            os.environ.get("TOOL_RESULT_CACHE_PATH", result_cache.DEFAULT_PATH) or None,
+            namespace=server_identity,
+        ),
+    )
+
+    # 配置了向量模型才开启混合检索，先于后台刷新开启，刷新到的工具才会同步进向量索引
+    if embedding_model := os.environ.get("GOOGLE_EMBEDDING_MODEL"):
+        await kit.enable_semantic(
+            semantic.SemanticIndex(
+                GoogleGenerativeAIEmbeddings(model=embedding_model),
+                embedding_model,
+                semantic.EmbeddingCache(
+                    os.environ.get("TOOL_EMBEDDING_CACHE_PATH", semantic.DEFAULT_PATH)
+                ),
+            )
+        )
+
+    tool_catalog.refresh(
+        DEFAULT_SERVER,
+        fetch,
+        call,
+        on_change=lambda v: kit.set_server(DEFAULT_SERVER, v),
+        identity=server_identity,
+    )
+
+    ctx = Context(
+        toolkit=kit,
+        model=new_google_gemini(),
+        tool_concurrency=int(os.environ.get("TOOL_CONCURRENCY", TOOL_CONCURRENCY)),
+        tool_timeout=float(os.environ.get("TOOL_TIMEOUT", TOOL_TIMEOUT)),
+        context_budget=int(os.environ.get("CONTEXT_TOKEN_BUDGET", compaction.CONTEXT_BUDGET)),
     )
-    ctx = Context(toolkit=kit, model=new_google_gemini())
 
     input = {
         "messages": [
@@ -185,7 +462,12 @@ async def main():
         ]
     }
 
-    r = await agent.ainvoke(input, context=ctx)
+    try:
+        r = await agent.ainvoke(input, context=ctx)
+    finally:
+        logger.info(f"MCP sessions: {manager.metrics()}")
+        logger.info(f"Tool result cache: {kit.results.metrics()}")
+        await manager.aclose()
     print("\n=== Conversion History ===\n")
     for m in r["messages"]:
         if isinstance(m.content, str) or m.type == "tool":
@@ -0,0 +1,211 @@
+"""
+只读 MCP 工具调用结果的本地 TTL 缓存：内存 LRU 在前，可选的 SQLite 文件在后。
+
+只有白名单里的幂等工具才缓存，键是命名空间（服务器地址和令牌摘要）、工具名加规范化后的
+参数，换了服务器或令牌不会读到别人的结果。白名单之外的工具一律视为
+写操作，调用后让同一仓库（参数里的 owner/repo）以及不区分仓库的缓存条目失效；写操作
+的参数里没有仓库时清空全部缓存。失效只涉及同一命名空间的条目。
+
+缓存的读写会访问 SQLite，``CachedTool`` 把它们放到线程里执行，不阻塞事件循环。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.tools import BaseTool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(".cache", "tool-results.sqlite")
+
+# 只读工具 -> 结果的 TTL（秒）。列表和搜索变化快，文件内容和提交相对稳定
+READ_ONLY_TTLS = {
+    "get_me": 60 * 60,
+    "get_file_contents": 10 * 60,
+    "get_commit": 60 * 60,
+    "issue_read": 5 * 60,
+    "pull_request_read": 5 * 60,
+    "list_branches": 5 * 60,
+    "list_commits": 60,
+    "list_issues": 60,
+    "list_pull_requests": 60,
+    "list_releases": 10 * 60,
+    "list_tags": 10 * 60,
+    "search_code": 5 * 60,
+    "search_issues": 60,
+    "search_pull_requests": 60,
+    "search_repositories": 10 * 60,
+}
+
+
+def cache_key(name: str, args: dict, namespace: str = "") -> str:
+    """Key of a call: the namespace, the tool name and its arguments in canonical JSON."""
+    params = json.dumps(args, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return f"{namespace}|{name}:{params}"
+
+
+def scope_of(args: dict) -> str:
+    """The ``owner/repo`` a call is about, or ``""`` if it is not about one repository."""
+    owner, repo = args.get("owner"), args.get("repo")
+    return f"{owner}/{repo}".lower() if owner and repo else ""
+
+
+class ResultCache:
+    """LRU in memory backed by an optional SQLite store, both honoring TTLs.
+
+    Args:
+        path: SQLite file path. ``None`` keeps the cache in memory only.
+        capacity: Max number of entries kept in the in-memory LRU.
+        namespace: Prefix of every key, identifying whose results these are,
+            e.g. ``github_mcp.identity()`` of the server URL and token.
+    """
+
+    def __init__(
+        self, path: str | None = DEFAULT_PATH, capacity: int = 1024, namespace: str = ""
+    ):
+        self.capacity = capacity
+        self.namespace = namespace
+        # 键 -> (结果, 过期时间, 仓库)
+        self.memory: OrderedDict[str, tuple[Any, float, str]] = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "invalidated": 0}
+
+        self.lock = threading.Lock()
+        self.db = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, scope TEXT NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS results_scope ON results (scope)")
+            self.db.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+            self.db.commit()
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached result, or ``None`` on a miss or an expired entry."""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self.memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[0]
+                del self.memory[key]
+
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT value, expires_at, scope FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1], row[2])
+                    self.stats["disk_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl: float, scope: str = ""):
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+        expires_at = time.time() + ttl
+        with self.lock:
+            self._remember(key, value, expires_at, scope)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, expires_at, scope) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, scope),
+                )
+                self.db.commit()
+
+    def invalidate(self, scope: str = ""):
+        """Drop entries of this namespace a write to ``scope`` may affect: those of
+        the same repository and those not tied to one. An empty scope drops all
+        entries of the namespace."""
+        # 其他服务器或令牌的条目不受这里的写操作影响
+        prefix = f"{self.namespace}|"
+        with self.lock:
+            stale = [
+                k
+                for k, v in self.memory.items()
+                if k.startswith(prefix) and (not scope or v[2] in (scope, ""))
+            ]
+            for k in stale:
+                del self.memory[k]
+            dropped = len(stale)
+
+            if self.db is not None:
+                if scope:
+                    cur = self.db.execute(
+                        "DELETE FROM results WHERE substr(key, 1, ?) = ? AND scope IN (?, '')",
+                        (len(prefix), prefix, scope),
+                    )
+                else:
+                    cur = self.db.execute(
+                        "DELETE FROM results WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+                    )
+                self.db.commit()
+                # 磁盘上的条目包含了内存里的
+                dropped = cur.rowcount
+
+            self.stats["invalidated"] += dropped
+        if dropped:
+            logger.info(f"Invalidated {dropped} cached tool results of '{scope or '*'}'")
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def metrics(self) -> dict:
+        return self.stats | {"entries": len(self.memory), "hit_rate": round(self.hit_rate(), 3)}
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _remember(self, key: str, value: Any, expires_at: float, scope: str):
+        self.memory[key] = (value, expires_at, scope)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+
+class CachedTool:
+    """Wraps a MCP tool, serving read-only calls from ``cache`` and
+    invalidating the cache after calls that may write."""
+
+    def __init__(self, tool: BaseTool, cache: ResultCache):
+        self.tool = tool
+        self.cache = cache
+        self.name = tool.name
+
+    async def ainvoke(self, args: dict) -> Any:
+        # 绕过 langgraph 缺陷时注入的 runtime 不是工具参数
+        params = {k: v for k, v in args.items() if k != "runtime"}
+
+        ttl = READ_ONLY_TTLS.get(self.name)
+        if ttl is None:
+            try:
+                return await self.tool.ainvoke(args)
+            finally:
+                # 写操作失败也可能已经部分生效
+                await asyncio.shield(asyncio.to_thread(self.cache.invalidate, scope_of(params)))
+
+        key = cache_key(self.name, params, self.cache.namespace)
+        out = await asyncio.to_thread(self.cache.get, key)
+        if out is None:
+            out = await self.tool.ainvoke(args)
+            await asyncio.to_thread(self.cache.set, key, out, ttl, scope_of(params))
+        return out
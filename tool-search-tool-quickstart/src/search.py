@@ -0,0 +1,152 @@
+"""
+基于倒排索引的工具检索。
+
+工具名按 snake_case/camelCase 拆词，描述去掉标点后做轻量的词干化；倒排表里只记录
+包含该词的工具，查询时只对命中的工具打 BM25 分，再用堆取前 k 个，耗时与命中的
+倒排表长度成正比，而不是与工具总数成正比。增删工具时只更新该工具涉及的倒排表。
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+
+# 依次匹配全大写缩写（HTTPResponse 中的 HTTP）、首字母大写或全小写的单词、数字
+WORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "this", "to", "use", "with", "you", "your",
+}
+# 名词复数的后缀及其替换
+PLURALS = (("sses", "ss"), ("ies", "y"), ("ches", "ch"), ("shes", "sh"), ("xes", "x"))
+VOWELS = re.compile(r"[aeiouy]")
+
+
+def stem(word: str) -> str:
+    """Strip plural, ``-ing``/``-ed`` and trailing ``e`` suffixes, so that e.g.
+    ``create``, ``creates``, ``created`` and ``creating`` share one stem."""
+    if len(word) <= 3:
+        return word
+
+    for suffix, repl in PLURALS:
+        if word.endswith(suffix):
+            word = word[: -len(suffix)] + repl
+            break
+    else:
+        if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+
+    for suffix in ("ing", "ed"):
+        base = word[: -len(suffix)]
+        if word.endswith(suffix) and len(base) >= 3 and VOWELS.search(base):
+            word = base
+            # running -> runn -> run
+            if word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Split ``text`` into stemmed lowercase terms, breaking up snake_case and
+    camelCase identifiers and dropping punctuation and stopwords."""
+    out = []
+    for w in WORD.findall(text):
+        w = w.lower()
+        if w not in STOPWORDS:
+            out.append(stem(w))
+    return out
+
+
+class SearchIndex:
+    """BM25 over an inverted index of documents, maintained incrementally.
+
+    Adding, updating or removing a document only touches the postings of its
+    own terms. IDF depends on the number of documents, so it is memoized and
+    recomputed lazily after the collection changes.
+
+    Args:
+        docs: Texts to index, by key.
+        k1: Term frequency saturation of BM25.
+        b: Document length normalization of BM25.
+    """
+
+    def __init__(self, docs: dict[str, str] | None = None, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        # 词 -> {文档键: 词频}
+        self.postings: dict[str, dict[str, int]] = {}
+        # 文档键 -> 文档包含的词，删除文档时据此清理倒排表
+        self.doc_terms: dict[str, tuple[str, ...]] = {}
+        self.doc_lens: dict[str, int] = {}
+        self.total_len = 0
+        self.idf: dict[str, float] = {}
+
+        for key, text in (docs or {}).items():
+            self.add(key, text)
+
+    def __len__(self) -> int:
+        return len(self.doc_lens)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.doc_lens
+
+    def add(self, key: str, text: str):
+        """Index ``text`` under ``key``, replacing the previous text of ``key``."""
+        if key in self.doc_lens:
+            self.remove(key)
+
+        terms = tokenize(text)
+        counts = Counter(terms)
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[key] = tf
+        self.doc_terms[key] = tuple(counts)
+        self.doc_lens[key] = len(terms)
+        self.total_len += len(terms)
+        self.idf.clear()
+
+    def remove(self, key: str):
+        """Drop ``key`` from the index, if present."""
+        if key not in self.doc_lens:
+            return
+
+        for term in self.doc_terms.pop(key):
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+        self.total_len -= self.doc_lens.pop(key)
+        self.idf.clear()
+
+    def _idf(self, term: str) -> float:
+        idf = self.idf.get(term)
+        if idf is None:
+            # 取 BM25+ 的 IDF 形式，避免高频词得到负分
+            n, df = len(self.doc_lens), len(self.postings[term])
+            idf = self.idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        return idf
+
+    def search(self, query: str, n: int = 3) -> list[tuple[str, float]]:
+        """Return up to ``n`` ``(key, score)`` pairs of the best matching
+        documents, ties broken by key so that rankings do not depend on the
+        order documents were added in."""
+        if not self.total_len:
+            return []
+
+        avgdl = self.total_len / len(self.doc_lens)
+        k1, b = self.k1, self.b
+        scores: dict[str, float] = {}
+        for term, qtf in Counter(tokenize(query)).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term) * qtf
+            for key, tf in postings.items():
+                norm = k1 * (1 - b + b * self.doc_lens[key] / avgdl)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        return heapq.nsmallest(n, scores.items(), key=lambda v: (-v[1], v[0]))
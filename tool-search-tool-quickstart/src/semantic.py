@@ -0,0 +1,169 @@
+"""
+基于向量的工具检索，与倒排索引的 BM25 结果做倒数排名融合（RRF）。
+
+智能体的措辞和工具描述不一致时（如 "open a bug" 和 ``create_issue``），BM25 找不到，
+向量检索可以补上。工具名、描述和参数名拼成一段文本向量化，向量按“模型 + 文本哈希”
+缓存在本地 SQLite，工具描述不变就不会重新向量化；增删工具时只向量化或删除对应的行。
+缓存的读写在线程里执行，不阻塞事件循环。
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(".cache", "tool-embeddings.sqlite")
+# RRF 的平滑常数，取原论文的 60
+RRF_K = 60
+
+
+def text_key(model: str, kind: str, text: str) -> str:
+    """Cache key of the ``kind`` ("doc" or "query") embedding of ``text``."""
+    return hashlib.sha256(f"{model}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Embeddings persisted in SQLite as float32 blobs."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self.lock = threading.Lock()
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        out = {}
+        with self.lock:
+            # SQLite 单条语句的参数个数有上限，分批查询
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for key, blob in rows:
+                    out[key] = np.frombuffer(blob, dtype=np.float32)
+        return out
+
+    def put_many(self, items: dict[str, np.ndarray]):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items.items()],
+            )
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class SemanticIndex:
+    """Cosine similarity search over embedded documents, maintained incrementally.
+
+    Vectors live in the first ``size`` rows of a matrix grown by doubling;
+    removing a document moves the last row into its slot.
+
+    Args:
+        embeddings: Model embedding documents and queries.
+        model: Name of the model, part of the cache key.
+        cache: Where embeddings are persisted. Defaults to none.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: EmbeddingCache | None = None):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+        # 前 size 行是归一化后的文档向量
+        self.matrix: np.ndarray | None = None
+        self.size = 0
+        self.keys: list[str] = []
+        self.rows: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    async def _embed(self, kind: str, texts: list[str]) -> np.ndarray:
+        keys = [text_key(self.model, kind, t) for t in texts]
+        found = await asyncio.to_thread(self.cache.get_many, keys) if self.cache else {}
+
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        if missing:
+            if kind == "query":
+                vectors = [await self.embeddings.aembed_query(texts[missing[0]])]
+            else:
+                vectors = await self.embeddings.aembed_documents([texts[i] for i in missing])
+            new = {keys[i]: np.asarray(v, dtype=np.float32) for i, v in zip(missing, vectors)}
+            if self.cache:
+                await asyncio.to_thread(self.cache.put_many, new)
+            found |= new
+            logger.info(f"Embedded {len(missing)}/{len(texts)} {kind} texts")
+
+        return normalize(np.stack([found[k] for k in keys]))
+
+    async def add(self, docs: dict[str, str]):
+        """Embed and index ``docs`` by key, replacing the previous vectors of
+        existing keys and reusing cached embeddings of unchanged texts."""
+        if not docs:
+            return
+        vectors = await self._embed("doc", list(docs.values()))
+
+        if self.matrix is None:
+            self.matrix = np.zeros((len(vectors), vectors.shape[1]), dtype=np.float32)
+        for key, v in zip(docs, vectors):
+            row = self.rows.get(key)
+            if row is None:
+                if self.size == len(self.matrix):
+                    grown = np.zeros((2 * self.size, self.matrix.shape[1]), dtype=np.float32)
+                    grown[: self.size] = self.matrix
+                    self.matrix = grown
+                row = self.rows[key] = self.size
+                self.keys.append(key)
+                self.size += 1
+            self.matrix[row] = v
+
+    def remove(self, key: str):
+        """Drop ``key`` from the index, if present."""
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+
+        last = self.size - 1
+        if row != last:
+            self.matrix[row] = self.matrix[last]
+            self.keys[row] = self.keys[last]
+            self.rows[self.keys[row]] = row
+        self.keys.pop()
+        self.size = last
+
+    async def search(self, query: str, n: int = 3) -> list[tuple[str, float]]:
+        """Return up to ``n`` ``(key, cosine)`` pairs of the closest documents,
+        ties broken by key."""
+        if not self.size:
+            return []
+
+        scores = self.matrix[: self.size] @ (await self._embed("query", [query]))[0]
+        n = min(n, self.size)
+        # 先用 argpartition 选出前 n 个，只对这 n 个排序
+        top = np.argpartition(-scores, n - 1)[:n]
+        out = [(self.keys[i], float(scores[i])) for i in top]
+        return sorted(out, key=lambda v: (-v[1], v[0]))
+
+
+def rrf(rankings: list[list[str]], n: int, k: int = RRF_K) -> list[str]:
+    """Fuse rankings of keys by reciprocal rank fusion, ties broken by key."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, i in enumerate(ranking):
+            scores[i] = scores.get(i, 0.0) + 1 / (k + rank + 1)
+    return sorted(scores, key=lambda i: (-scores[i], i))[:n]
@@ -0,0 +1,296 @@
+"""
+长连接的 MCP 会话管理。
+
+每个 MCP 服务器保持一条初始化好的会话，所有工具调用并发复用它（JSON-RPC 请求按 id
+多路复用），不再每次调用都重新建连和握手。后台任务定期 ping 做健康检查，连接断开、
+调用遇到传输层错误或 ping 不通时按指数退避加随机抖动重连，并统计连接次数和调用延迟。
+单个调用超时或被调用方取消不代表连接已断，只会让健康检查提前 ping 一次。
+配置错误和凭据被拒这类重连也解决不了的问题不重试，直接报给调用方。
+"""
+
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections import deque
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from datetime import timedelta
+from typing import Any, AsyncIterator, Callable
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CallToolResult, Tool
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 30.0
+# 单个工具调用等待响应的秒数，应小于调用方自己的超时
+CALL_TIMEOUT = 30.0
+HEALTH_INTERVAL = 30.0
+HEALTH_TIMEOUT = 5.0
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+# 统计延迟分位数时保留的最近调用数
+LATENCY_WINDOW = 1000
+# 等待响应超时的 McpError 错误码
+REQUEST_TIMEOUT = 408
+
+
+@asynccontextmanager
+async def streamable_http(url: str, headers: dict | None = None) -> AsyncIterator[ClientSession]:
+    """Open and initialize a session to a streamable HTTP MCP server."""
+    async with streamablehttp_client(url, headers=headers) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            yield session
+
+
+def is_permanent(e: BaseException) -> bool:
+    """Whether reconnecting cannot fix ``e``: the server rejected the credential."""
+    if isinstance(e, BaseExceptionGroup):
+        return all(is_permanent(v) for v in e.exceptions)
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return status in (401, 403)
+
+
+class ServerSession:
+    """A long-lived, health-checked session to one MCP server.
+
+    The session is opened and closed by a supervisor task, since the transport
+    must be entered and exited in the same task; callers only borrow it.
+
+    Args:
+        name: Name of the server, used in logs and metrics.
+        connect: Opens an initialized session, e.g. ``lambda: streamable_http(url)``.
+        connect_timeout: Seconds a caller waits for the session to be connected.
+        call_timeout: Seconds a tool call waits for its response; a timeout
+            triggers an early health check.
+        health_interval: Seconds between pings of an idle session.
+        health_timeout: Seconds a ping may take before the session is deemed broken.
+        backoff: Base delay in seconds of the reconnect backoff.
+        max_backoff: Cap of the reconnect delay in seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], AbstractAsyncContextManager[ClientSession]],
+        connect_timeout: float = CONNECT_TIMEOUT,
+        call_timeout: float = CALL_TIMEOUT,
+        health_interval: float = HEALTH_INTERVAL,
+        health_timeout: float = HEALTH_TIMEOUT,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+    ):
+        self.name = name
+        self.connect = connect
+        self.connect_timeout = connect_timeout
+        self.call_timeout = call_timeout
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session: ClientSession | None = None
+        self.ready = asyncio.Event()
+        # 调用发现连接已坏时置位，监督任务随即重连
+        self.broken = asyncio.Event()
+        # 调用超时时置位，健康检查随即 ping 一次
+        self.check = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        # 重连解决不了的错误，出现后不再重连
+        self.error: Exception | None = None
+
+        self.connects = 0
+        self.failures = 0
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def start(self):
+        if self.error is None and (self.task is None or self.task.done()):
+            self.task = asyncio.create_task(self._supervise())
+
+    async def aclose(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _supervise(self):
+        attempt = 0
+        while True:
+            try:
+                opening = self.connect()
+            except Exception as e:
+                # 连接方式本身就出错了（如缺少配置），重连也没用
+                self._fail(e)
+                return
+
+            try:
+                started = time.perf_counter()
+                async with opening as session:
+                    self.session = session
+                    self.connects += 1
+                    attempt = 0
+                    self.broken.clear()
+                    self.check.clear()
+                    self.ready.set()
+                    logger.info(
+                        f"Connected to MCP server {self.name} in {time.perf_counter() - started:.3f}s"
+                    )
+                    await self._watch(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if is_permanent(e):
+                    self._fail(e)
+                    return
+                self.failures += 1
+                logger.warning(f"MCP session to {self.name} failed: {e!r}")
+            finally:
+                self.ready.clear()
+                self.session = None
+
+            delay = min(self.max_backoff, self.backoff * 2**attempt)
+            attempt += 1
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+
+    async def _watch(self, session: ClientSession):
+        """Ping the session periodically or when asked to, returning once it is broken."""
+        while True:
+            try:
+                await asyncio.wait_for(self.check.wait(), self.health_interval)
+            except TimeoutError:
+                pass
+            if self.broken.is_set():
+                return
+            self.check.clear()
+            await asyncio.wait_for(session.send_ping(), self.health_timeout)
+
+    async def acquire(self) -> ClientSession:
+        """Wait until the session is connected and return it."""
+        self.start()
+        if not self.ready.is_set() and self.task is not None:
+            # 监督任务因不可恢复的错误退出时不必等到超时
+            ready = asyncio.create_task(self.ready.wait())
+            try:
+                await asyncio.wait(
+                    [ready, self.task],
+                    timeout=self.connect_timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            finally:
+                ready.cancel()
+
+        if self.error is not None:
+            raise ConnectionError(f"MCP server {self.name} unusable: {self.error!r}") from self.error
+        if not self.ready.is_set():
+            raise ConnectionError(
+                f"MCP server {self.name} not connected after {self.connect_timeout}s"
+            )
+        return self.session
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> CallToolResult:
+        session = await self.acquire()
+        self.calls += 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await session.call_tool(
+                name, arguments, read_timeout_seconds=timedelta(seconds=self.call_timeout)
+            )
+        except McpError as e:
+            self.errors += 1
+            # 协议错误是服务端正常返回的，连接本身没问题；等不到响应可能只是这个调用慢，
+            # 由健康检查的 ping 判断连接是否已断
+            if e.error.code == REQUEST_TIMEOUT:
+                self._suspect(session)
+            raise
+        except Exception:
+            # 传输层错误说明连接已断，交给监督任务重连；调用方取消的调用不影响连接
+            self.errors += 1
+            self._break(session)
+            raise
+        finally:
+            self.in_flight -= 1
+            self.latencies.append(time.perf_counter() - started)
+
+    async def list_tools(self) -> list[Tool]:
+        session = await self.acquire()
+        return (await session.list_tools()).tools
+
+    def _fail(self, e: Exception):
+        self.failures += 1
+        self.error = e
+        logger.error(f"MCP session to {self.name} failed permanently: {e!r}")
+
+    def _suspect(self, session: ClientSession):
+        if self.session is session:
+            self.check.set()
+
+    def _break(self, session: ClientSession):
+        if self.session is session:
+            # 不再把要断开的会话交给新的调用
+            self.ready.clear()
+            self.broken.set()
+            self.check.set()
+
+    def metrics(self) -> dict:
+        out = {
+            "connected": self.ready.is_set(),
+            "connects": self.connects,
+            "failures": self.failures,
+            "calls": self.calls,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+        }
+        if len(self.latencies) >= 2:
+            q = statistics.quantiles(self.latencies, n=100)
+            out |= {"p50_ms": round(q[49] * 1000, 1), "p95_ms": round(q[94] * 1000, 1)}
+        return out
+
+
+class SessionManager:
+    """Long-lived sessions to MCP servers, by server name."""
+
+    def __init__(self):
+        self.servers: dict[str, ServerSession] = {}
+
+    def add(
+        self,
+        name: str,
+        connect: Callable[[], AbstractAsyncContextManager[ClientSession]],
+        **kwargs,
+    ) -> ServerSession:
+        """Register a server; its session is opened on first use.
+
+        Args:
+            kwargs: Passed to :class:`ServerSession`.
+        """
+        self.servers[name] = ServerSession(name, connect, **kwargs)
+        return self.servers[name]
+
+    async def remove(self, name: str):
+        server = self.servers.pop(name, None)
+        if server is not None:
+            await server.aclose()
+
+    async def call_tool(self, server: str, name: str, arguments: dict[str, Any]) -> CallToolResult:
+        return await self.servers[server].call_tool(name, arguments)
+
+    async def list_tools(self, server: str) -> list[Tool]:
+        return await self.servers[server].list_tools()
+
+    def metrics(self) -> dict[str, dict]:
+        return {name: v.metrics() for name, v in self.servers.items()}
+
+    async def aclose(self):
+        for server in self.servers.values():
+            await server.aclose()